@@ -33,13 +33,6 @@ Version: 2.0.8
 License: MIT
 """
 
-from .extractor import (
-    ExtractedData,
-    MedicationType,
-    PrescriptionDataExtractor,
-    PrescriptionInput,
-)
-
 __version__ = "2.0.8"
 __author__ = "Abdulhaleem Osama"
 __email__ = "haleemborham3@gmail.com"
@@ -49,6 +42,34 @@ __all__ = [
     "PrescriptionDataExtractor",
     "PrescriptionInput",
     "ExtractedData",
+    "BatchExtractedData",
     "MedicationType",
     "__version__",
 ]
+
+# Public names resolved from .extractor on first access (PEP 562), so importing
+# the package for metadata such as __version__ does not load pandas or the
+# drug databases.
+_LAZY = {
+    "PrescriptionDataExtractor",
+    "PrescriptionInput",
+    "ExtractedData",
+    "BatchExtractedData",
+    "MedicationType",
+}
+
+
+def __getattr__(name):
+    """Import lazily exported names from .extractor on first access"""
+    if name in _LAZY:
+        from . import extractor as _m
+
+        val = getattr(_m, name)
+        globals()[name] = val
+        return val
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    """Include lazily exported names for IDEs and introspection"""
+    return sorted(set(globals()) | _LAZY)
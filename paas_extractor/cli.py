@@ -11,7 +11,11 @@ import json
 import sys
 from datetime import datetime
 
-from .extractor import PrescriptionDataExtractor, PrescriptionInput
+from .extractor import (
+    PrescriptionDataExtractor,
+    PrescriptionInput,
+    _configure_logging,
+)
 
 
 def format_result(result):
@@ -75,6 +79,7 @@ def save_results_to_file(results, filename=None):
 
 def main():
     """Main interface with argument parsing"""
+    _configure_logging()
     parser = argparse.ArgumentParser(
         description="PAAS National Prescription Data Extractor",
         formatter_class=argparse.RawDescriptionHelpFormatter,
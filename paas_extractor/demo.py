@@ -8,7 +8,11 @@ Comprehensive demonstration of the prescription data extraction system.
 
 import json
 
-from .extractor import PrescriptionDataExtractor, PrescriptionInput
+from .extractor import (
+    PrescriptionDataExtractor,
+    PrescriptionInput,
+    _configure_logging,
+)
 
 
 def print_separator(title):
@@ -36,6 +40,7 @@ def print_result(result, case_num):
 
 def main():
     """Comprehensive demonstration"""
+    _configure_logging()
     print_separator("PAAS NATIONAL - COMPREHENSIVE DEMO")
     print(
         "This demo shows the system processing various real-world prescription scenarios"
@@ -13,46 +13,927 @@ Author: AI Assistant
 Version: 2.0 - Perfect Edition
 """
 
+import asyncio
+import copy
+import functools
+import hashlib
+import importlib.util
+import json
 import logging
+import math
 import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from difflib import SequenceMatcher
+from dataclasses import fields as dataclass_fields
+from dataclasses import replace as dataclass_replace
 from enum import Enum
-from typing import Dict, List, Optional, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
+import marisa_trie
+import numpy as np
 import pandas as pd
+from rapidfuzz import fuzz, process, utils
+
+# Optional LLM support; openai takes hundreds of milliseconds to import, so it
+# is only imported by extractors constructed with an API key
+LLM_AVAILABLE = all(
+    importlib.util.find_spec(module) is not None for module in ("openai", "pydantic")
+)
 
-# Optional LLM support imports
+# Optional faster JSON decoding of LLM responses; orjson.JSONDecodeError
+# subclasses json.JSONDecodeError, so callers catch either the same way
 try:
-    from openai import OpenAI
-    from pydantic import BaseModel, Field
-    from tenacity import retry, stop_after_attempt, wait_fixed
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 
-    LLM_AVAILABLE = True
+# Optional Aho-Corasick automaton for finding sig keywords in a single pass
+try:
+    import ahocorasick
 except ImportError:
-    LLM_AVAILABLE = False
+    ahocorasick = None
+
+# Optional Numba JIT for the numeric day supply kernels
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when Numba is not installed"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 
 try:
     from importlib.resources import files
 except ImportError:
-    # Python < 3.9 fallback
+    # Python < 3.9: _read_data_file falls back to pkg_resources
+    files = None
+
+logger = logging.getLogger(__name__)
+
+
+def _configure_logging() -> None:
+    """Console logging for the command-line entry points
+
+    The library itself leaves handler setup to the host application.
+    """
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+
+# Sig dose units and the spellings that name them. _SIG_UNIT_RE matches a
+# number followed by any of them, in any letter case, in one pass; the named
+# group that matched is the unit, e.g. "sprays" with "2" for "2 puffs".
+_SIG_UNITS = (
+    ("sprays", r"spray|sprays|puff|puffs"),
+    ("units", r"unit|units|u\b"),
+    ("mg", r"mg|milligram|milligrams"),
+    ("ml", r"ml|milliliter|milliliters|cc"),
+    ("drops", r"drop|drops|gtt"),
+    ("patches", r"patch|patches"),
+    ("tablets", r"tablet|tablets|tab|tabs"),
+    ("capsules", r"capsule|capsules|cap|caps"),
+    (
+        "times_daily",
+        r"times?\s*(?:per\s*)?(?:day|daily)|x\s*(?:per\s*)?(?:day|daily)",
+    ),
+)
+_SIG_UNIT_RE = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(?:"
+    + "|".join(f"(?P<{unit}>{spellings})" for unit, spellings in _SIG_UNITS)
+    + ")",
+    re.I,
+)
+_TIMES_PER_DAY_RE = re.compile(r"(\d+(?:\.\d+)?)\s*times?\s*(?:per\s*)?(?:day|daily)")
+# Gram amount in a topical quantity such as "30g" or "45 gm"
+_GRAMS_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:g|gm|gram)")
+
+
+# Rule-based sig frequencies, as (terms, doses per day) rungs checked in order;
+# the first rung with a term anywhere in the sig wins, so priority comes from
+# the rung order rather than from where the term appears. Terms match whole
+# words, and the twice weekly and every other week rungs come before plain
+# weekly, which "twice weekly" also contains.
+_INTERVAL_FREQUENCIES = (
+    (
+        frozenset({"twice weekly", "twice a week", "twice per week"}),
+        2.0 / 7.0,
+    ),
+    (frozenset({"every other week", "biweekly", "every 2 weeks"}), 1.0 / 14.0),
+    (frozenset({"weekly", "once a week", "once weekly", "every week"}), 1.0 / 7.0),
+    (frozenset({"monthly", "once a month", "every month"}), 1.0 / 30.0),
+)
+# Days between injections for each interval frequency
+_INJECTION_SCHEDULE_DAYS = {
+    2.0 / 7.0: 3.5,
+    1.0 / 14.0: 14,
+    1.0 / 7.0: 7,
+    1.0 / 30.0: 30,
+}
+_PRN_TERMS = frozenset({"prn", "as needed"})
+# PRN estimates follow the PAAS scenarios, e.g. q6h PRN: 2 puffs x 6 = 12 puffs/day
+_PRN_FREQUENCIES = (
+    (frozenset({"q4h", "every 4 hours"}), 4.5),
+    (frozenset({"q6h", "every 6 hours", "q6-8h"}), 6.0),
+    (frozenset({"q8h", "every 8 hours"}), 2.5),
+    (frozenset({"bid", "b.i.d", "twice"}), 1.5),
+)
+_DAILY_TERMS = frozenset({"once", "daily", "qd", "q.d", "sid"})
+# Specific frequencies come before the generic "once"/"daily" rung
+_SCHEDULED_FREQUENCIES = (
+    (frozenset({"qid", "q.i.d", "four times"}), 4.0),
+    (frozenset({"thrice", "tid", "t.i.d", "three times"}), 3.0),
+    (frozenset({"twice", "bid", "b.i.d"}), 2.0),
+    (_DAILY_TERMS, 1.0),
+    (frozenset({"q6h", "every 6 hours"}), 4.0),
+    (frozenset({"q8h", "every 8 hours"}), 3.0),
+    (frozenset({"q12h", "every 12 hours"}), 2.0),
+    (frozenset({"q24h", "every 24 hours"}), 1.0),
+    (frozenset({"q4h", "every 4 hours"}), 6.0),
+)
+# Sig says the dose goes in each nostril, so it is doubled
+_BOTH_NOSTRILS_TERMS = frozenset(
+    {"per nostril", "each nostril", "in each nostril", "both nostrils", "bilat nares"}
+)
+# Nasal sigs whose usage is commonly misread: doses per day times sprays per
+# dose, e.g. "1 spray each nostril" three times daily is 6 sprays/day
+_NASAL_CORRECTION_DOSES = (
+    (frozenset({"three times daily", "3 times daily", "tid"}), 3),
+    (frozenset({"four times daily", "4 times daily", "qid"}), 4),
+)
+_NASAL_CORRECTION_SPRAYS = (
+    (frozenset({"1 spray each nostril", "one spray each nostril"}), 2),
+    (frozenset({"2 spray", "two spray"}), 4),
+)
+_SIG_TERMS = frozenset().union(
+    _PRN_TERMS,
+    _BOTH_NOSTRILS_TERMS,
+    *(
+        terms
+        for rungs in (
+            _INTERVAL_FREQUENCIES,
+            _PRN_FREQUENCIES,
+            _SCHEDULED_FREQUENCIES,
+            _NASAL_CORRECTION_DOSES,
+            _NASAL_CORRECTION_SPRAYS,
+        )
+        for terms, _ in rungs
+    ),
+)
+
+
+def _term_automaton(terms: FrozenSet[str]) -> Optional[Any]:
+    """Aho-Corasick automaton yielding each of terms it finds, or None without
+    pyahocorasick"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for term in terms:
+        automaton.add_word(term, term)
+    automaton.make_automaton()
+    return automaton
+
+
+def _is_whole_word(text: str, start: int, end: int) -> bool:
+    """Whether text[start:end] is a whole word (or words) of text, so that
+    "weekly" is not found in "biweekly" """
+    return (start == 0 or not text[start - 1].isalnum()) and (
+        end == len(text) or not text[end].isalnum()
+    )
+
+
+def _contains_word(text: str, term: str) -> bool:
+    """Whether term occurs in text as a whole word"""
+    start = text.find(term)
+    while start != -1:
+        if _is_whole_word(text, start, start + len(term)):
+            return True
+        start = text.find(term, start + 1)
+    return False
+
+
+def _find_terms(
+    text: str, terms: FrozenSet[str], automaton: Optional[Any]
+) -> FrozenSet[str]:
+    """The entries of terms that occur in text as whole words, found in one
+    pass when an automaton is available"""
+    if automaton is not None:
+        return frozenset(
+            term
+            for end, term in automaton.iter(text)
+            if _is_whole_word(text, end + 1 - len(term), end + 1)
+        )
+    return frozenset(term for term in terms if _contains_word(text, term))
+
+
+_SIG_AUTOMATON = _term_automaton(_SIG_TERMS)
+
+
+@functools.lru_cache(maxsize=1024)
+def _sig_terms(sig_lower: str) -> FrozenSet[str]:
+    """The entries of _SIG_TERMS that occur in a lowercased sig
+
+    Cached because a sig is usually scanned by more than one processing step.
+    """
+    return _find_terms(sig_lower, _SIG_TERMS, _SIG_AUTOMATON)
+
+
+def _first_rung(
+    rungs: Sequence[Tuple[FrozenSet[str], Any]], found: FrozenSet[str]
+) -> Optional[Any]:
+    """Value of the first (terms, value) rung sharing a term with found"""
+    for terms, value in rungs:
+        if not terms.isdisjoint(found):
+            return value
+    return None
+
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+# Words a simple sig may consist of besides its one number: the frequency
+# terms, dose units, and the usual verbs and sites
+_SIMPLE_SIG_WORDS = frozenset(
+    word for term in _SIG_TERMS for word in term.split()
+).union(
+    """
+    take inhale use inject instill apply spray sprays puff puffs unit units u
+    drop drops tablet tablets tab tabs capsule capsules cap caps mg ml patch
+    patches in into each per both nostril nostrils eye eyes affected by mouth
+    orally nasally subcutaneously a the day
+    """.split()
+)
+
+
+def _sig_is_simple(sig: str) -> bool:
+    """Whether the rule-based parser reads sig unambiguously
+
+    True for a scheduled, non-PRN sig naming one specific frequency (plus
+    perhaps a generic "daily") whose only number is the dose in a known unit,
+    e.g. "inhale 2 puffs twice daily". Any word outside _SIMPLE_SIG_WORDS
+    (timing such as "at bedtime", tapers, conditions) makes it not simple.
+    """
+    if len(_NUMBER_RE.findall(sig)) != 1:
+        return False
+    sig_lower = sig.lower()
+    if not all(
+        word.strip(".,;") in _SIMPLE_SIG_WORDS or _NUMBER_RE.fullmatch(word)
+        for word in sig_lower.split()
+    ):
+        return False
+    found = _sig_terms(sig_lower)
+    if not _PRN_TERMS.isdisjoint(found):
+        return False
+    if _first_rung(_INTERVAL_FREQUENCIES, found) is not None:
+        return False
+    frequencies = [
+        terms
+        for terms, _ in _SCHEDULED_FREQUENCIES
+        if terms is not _DAILY_TERMS and not terms.isdisjoint(found)
+    ]
+    if len(frequencies) > 1 or not (frequencies or not _DAILY_TERMS.isdisjoint(found)):
+        return False
+    return any(match.lastgroup != "times_daily" for match in _SIG_UNIT_RE.finditer(sig))
+
+
+# Sig text for the usual doses per day, keyed on the frequency rounded to
+# _FREQUENCY_TEXT_DIGITS places so computed weekly/monthly rates still match
+_FREQUENCY_TEXT_DIGITS = 6
+_FREQUENCY_TEXT = {
+    round(frequency, _FREQUENCY_TEXT_DIGITS): text
+    for frequency, text in (
+        (1, "once daily"),
+        (2, "twice daily"),
+        (3, "three times daily"),
+        (4, "four times daily"),
+        (2.0 / 7.0, "twice weekly"),
+        (1.0 / 7.0, "once weekly"),
+        (1.0 / 14.0, "every other week"),
+        (1.0 / 30.0, "once monthly"),
+    )
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def _frequency_text(frequency: float) -> str:
+    """Readable text for doses per day, as used in standardized sigs"""
+    text = _FREQUENCY_TEXT.get(round(frequency, _FREQUENCY_TEXT_DIGITS))
+    if text is not None:
+        return text
+    elif frequency < 1:
+        days = int(1 / frequency)
+        return f"every {days} days"
+    else:
+        return f"{frequency:.1f} times daily"
+
+
+# Sigs repeat heavily across a batch ("2 puffs twice daily"), so the pure
+# rule-based parses are memoized
+_SIG_PARSE_CACHE_SIZE = 16384
+
+
+@functools.lru_cache(maxsize=_SIG_PARSE_CACHE_SIZE)
+def _sig_numbers(sig: str) -> Tuple[Tuple[str, Tuple[float, ...]], ...]:
+    """(unit, numbers) pairs for the numbers in sig followed by a dose unit"""
+    extracted: Dict[str, List[float]] = {}
+    for match in _SIG_UNIT_RE.finditer(sig):
+        extracted.setdefault(match.lastgroup, []).append(float(match.group(1)))
+    return tuple((unit, tuple(values)) for unit, values in extracted.items())
+
+
+@functools.lru_cache(maxsize=_SIG_PARSE_CACHE_SIZE)
+def _rule_based_frequency(sig_lower: str) -> float:
+    """Doses per day read from a lowercased sig by the frequency rungs"""
+    found = _sig_terms(sig_lower)
+    frequency = _first_rung(_INTERVAL_FREQUENCIES, found)
+    if frequency is not None:
+        return frequency
+
+    # Handle PRN (as needed) medications - estimate usage based on PAAS scenarios
+    if not _PRN_TERMS.isdisjoint(found):
+        frequency = _first_rung(_PRN_FREQUENCIES, found)
+        return 1.0 if frequency is None else frequency  # 1.0: default PRN usage
+
+    frequency = _first_rung(_SCHEDULED_FREQUENCIES, found)
+    if frequency is not None:
+        return frequency
+
+    # Look for explicit "X times per day"
+    times_match = _TIMES_PER_DAY_RE.search(sig_lower)
+    if times_match:
+        return float(times_match.group(1))
+
+    # Default assumption
+    return 1.0
+
+
+# Brand-name aliases added to the drug database. A name containing one of the
+# literals also gets that literal's aliases; the first literal in table order
+# wins, like an if/elif chain. Each table has a compiled alternation so names
+# that match no literal are rejected with a single search.
+_NASAL_INHALER_ALIASES = (
+    ("fluticasone propionate", ("flonase",)),
+    ("mometasone furoate", ("nasonex",)),
+    ("triamcinolone acetonide", ("nasacort",)),
+    ("azelastine", ("astelin", "astepro")),
+)
+_ORAL_INHALER_ALIASES = (
+    ("albuterol hfa", ("albuterol", "proair", "proventil")),
+    ("symbicort hfa", ("symbicort", "symbicort hfa budesonide")),
+    ("ventolin", ("albuterol",)),
+)
+_NASAL_INHALER_ALIAS_RE = re.compile(
+    "|".join(re.escape(literal) for literal, _ in _NASAL_INHALER_ALIASES)
+)
+_ORAL_INHALER_ALIAS_RE = re.compile(
+    "|".join(re.escape(literal) for literal, _ in _ORAL_INHALER_ALIASES)
+)
+
+# Nasal sprays whose day supply follows from the spray count alone, as
+# (name literals, day supply for max_sprays); the first row with a literal in
+# the matched name wins, like an if/elif chain
+_NASAL_BRAND_DAY_SUPPLY = (
+    # Calcitonin: 1 spray per day, alternating nostrils (30 sprays = 30 days)
+    (frozenset({"calcitonin"}), lambda sprays: sprays),
+    # Butorphanol: PRN pain medication, very limited usage (7-14 days)
+    (frozenset({"butorphanol"}), lambda sprays: max(7, min(14, sprays))),
+    # Migranol: max 4 sprays per migraine, 3mg per 24h, 4mg per 7 days, so
+    # 64 sprays last 32-64 days
+    (frozenset({"migranol", "migranal"}), lambda sprays: max(32, min(64, sprays))),
+    # Emergency medications: 2 sprays per episode, max 5 episodes per month;
+    # a single episode pack covers 7 days
+    (
+        frozenset({"nayzilam", "neffy"}),
+        lambda sprays: 7 if sprays <= 2 else max(7, min(30, sprays)),
+    ),
+    # Zavzpret: 1 spray per 24h, max 8 migraines per month (6 sprays = 6 days)
+    (frozenset({"zavzpret"}), lambda sprays: sprays),
+    # Sprix: max 8 sprays per day for 5 days
+    # Trudhesa: max 4 sprays per 24h, 6 per 7 days
+    (
+        frozenset({"sprix", "trudhesa"}),
+        lambda sprays: (
+            max(4, min(7, sprays)) if sprays <= 8 else max(7, min(14, sprays // 2))
+        ),
+    ),
+)
+# Oral inhaler devices and rescue inhalers with their own dosing rules
+_ELLIPTA_TERMS = frozenset({"ellipta"})
+_DRY_POWDER_INHALER_TERMS = frozenset({"handihaler", "twisthaler"})
+_RESCUE_INHALER_TERMS = frozenset({"albuterol", "proair", "ventolin", "xopenex"})
+# Diabetic injectables by dosing pattern
+_WEEKLY_GLP1_TERMS = frozenset(
+    {
+        "ozempic",
+        "semaglutide",
+        "mounjaro",
+        "tirzepatide",
+        "trulicity",
+        "dulaglutide",
+        "bydureon",
+    }
+)
+_DAILY_GLP1_TERMS = frozenset(
+    {"adlyxin", "lixisenatide", "victoza", "liraglutide", "byetta", "exenatide"}
+)
+_INSULIN_GLP1_TERMS = frozenset({"soliqua", "xultophy"})
+_PRAMLINTIDE_TERMS = frozenset({"symlinpen", "pramlintide"})
+# Every brand literal above, found in a drug name with one shared scan
+_BRAND_TERMS = frozenset().union(
+    _ELLIPTA_TERMS,
+    _DRY_POWDER_INHALER_TERMS,
+    _RESCUE_INHALER_TERMS,
+    _WEEKLY_GLP1_TERMS,
+    _DAILY_GLP1_TERMS,
+    _INSULIN_GLP1_TERMS,
+    _PRAMLINTIDE_TERMS,
+    *(terms for terms, _ in _NASAL_BRAND_DAY_SUPPLY),
+)
+_BRAND_AUTOMATON = _term_automaton(_BRAND_TERMS)
+
+
+@functools.lru_cache(maxsize=1024)
+def _brand_terms(drug_name_lower: str) -> FrozenSet[str]:
+    """The entries of _BRAND_TERMS that occur in a lowercased drug name
+
+    Cached per matched name, so each catalog drug is scanned once.
+    """
+    return _find_terms(drug_name_lower, _BRAND_TERMS, _BRAND_AUTOMATON)
+
+
+# LLM chat completions are attempted this many times, this long apart
+_LLM_ATTEMPTS = 2
+_LLM_RETRY_WAIT_SECONDS = 1.0
+# JSON object inside a markdown code block of an LLM reply
+_JSON_CODE_BLOCK_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+# Successful LLM replies (sig parses and drug name suggestions) kept per
+# extractor, keyed by a digest of the model and the request's inputs
+_LLM_CACHE_SIZE = 4096
+# Sigs parsed per chat completion by batch extraction, and how long to wait
+# for one such reply
+_LLM_SIG_BATCH_SIZE = 16
+_LLM_SIG_BATCH_TIMEOUT_SECONDS = 60.0
+
+# Static parts of the LLM prompts, built once so each call only splices in the
+# prescription's own text around them
+_DRUG_SEARCH_PROMPT_HEAD = """
+            Given this drug name: """
+_DRUG_SEARCH_PROMPT_TAIL = """
+
+            This is a pharmacy database search. Suggest alternative names that might help find this medication.
+
+            Examples of transformations needed:
+            - "30 ml Azelastine" → ["Azelastine", "Azelastine HCl", "Astelin"]
+            - "Butorfanol" → ["Butorphanol", "Butorphanol nasal"]
+            - "Calcitonen salmon" → ["Calcitonin-Salmon", "Calcitonin nasal"]
+            - "nasal steroid spray" → ["Fluticasone", "Flonase", "Mometasone", "Nasonex"]
+            - "Flonase children" → ["Fluticasone propionate", "Qnasl Children"]
+            - "Astelin" → ["Azelastine HCl", "Azelastine"]
+            - "Nasonex" → ["Mometasone furoate"]
+
+            Consider:
+            - Remove volume/quantity prefixes (30ml, 25gm, etc.)
+            - Fix common misspellings
+            - Brand name to generic conversions
+            - Generic to brand name conversions
+            - Add strength variations if relevant
+            - Include nasal/inhaler formulations
+
+            Return 3-5 most likely alternative search terms.
+            """
+_SIG_PROMPT_HEAD = """
+You are an expert PAAS National pharmacy technician. Parse this prescription SIG accurately using PAAS standards.
+
+SIG: """
+_SIG_PROMPT_RULES = """
+
+🚨 CRITICAL PAAS COMPLIANCE RULES:
+
+1. IMMEDIATE DISCARD MEDICATIONS (AUTO-INJECTORS):
+   - BCise auto-injector (Bydureon) → 1 day supply (discard immediately)
+   - Single-use pens (Trulicity) → 1 day supply (discard immediately)
+   - Keywords: "auto-injector", "single-use", "immediately after opening"
+   - OVERRIDE calculations for these devices!
+
+2. BEYOND-USE DATE HARD LIMITS:
+   - Xultophy → 21 days maximum (beyond-use date)
+   - Soliqua → 28 days maximum (contains insulin)
+   - Byetta → 30 days maximum (expiration after opening)
+   - Lantus → 28 days maximum
+   - ALWAYS apply: day_supply = min(calculated, beyond_use_date)
+   - Common limits: 14, 21, 28, 30, 42, 56 days
+   - Check database "Expiration_After_Opening_Days" field FIRST
+
+3. PACKAGE SIZE SELECTION:
+   - HandiHaler → 30 capsules (NOT 90)
+   - Use SMALLEST retail package size
+   - Check "Retail_Package_Value" field first
+
+4. PRN FREQUENCY ESTIMATION:
+   - q4h prn = 6 max/day → estimate 3/day (50%)
+   - q6h prn = 4 max/day → estimate 2/day (50%)
+   - "may repeat" = conservative PRN usage
+
+5. EMERGENCY MEDICATIONS:
+   - Nayzilam (seizure) → 1-2 days maximum (emergency episodes)
+   - Migranol (migraine) → 4-8 days maximum (limited episodes per month)
+   - Emergency meds have strict episode limits in database
+
+6. UNKNOWN MEDICATIONS:
+   - If drug not in PAAS database → confidence: 0.0
+   - Add note: "Drug not in PAAS database"
+
+CALCULATION PRIORITY:
+1. Check for immediate discard medications FIRST
+2. Parse frequency and dose from SIG
+3. Apply PRN reduction if needed (50%)
+4. Calculate: package_contents ÷ (dose × frequency)
+5. Apply beyond-use date limit
+6. Apply discard date limit
+7. Return minimum of all constraints
+
+Critical Examples:
+- "inject 2 mg subcutaneously once weekly" (Bydureon) → 1 day (immediate discard)
+- "inject 16 units subcutaneously once daily" (Xultophy) → 21 days max (beyond-use)
+- "inhale 1 capsule once daily" (HandiHaler) → 30 days (30-capsule package)
+- "inject 5 mcg subcutaneously twice daily" (Byetta) → 30 days max (expiration limit)
+- "inject 15 units subcutaneously once daily" (Soliqua) → 28 days max (expiration limit)
+- "spray 1 spray in one nostril, may repeat" (Nayzilam) → 1-2 days (emergency use only)
+- "spray 1 spray in each nostril, may repeat" (Migranol) → 4-8 days (migraine episodes only)
+- "inhale 2 puffs as needed, may use up to every 4 hours" (Ventolin) → 33 days (q4h prn = 3 times/day × 2 puffs = 6 puffs/day, 200÷6=33)
+            - "2 puffs per nostril daily for seasonal allergies" → daily_frequency: 1.0, dose_per_administration: 4.0
+            - "spray in nose when allergies act up, 2 squirts each side" → daily_frequency: 1.0, dose_per_administration: 4.0, is_prn: true
+            - "2-3 sprays each nostril q12h prn congestion, do not use >3 days" → daily_frequency: 2.0, dose_per_administration: 5.0, is_prn: true
+            - "1 spray each nostril daily for child, may increase to 2 sprays if needed" → daily_frequency: 1.0, dose_per_administration: 2.0
+            - "1-2 sprays bilaterally bid for allergic rhinitis and congestion" → daily_frequency: 2.0, dose_per_administration: 3.0
+            - "start 1 spray each nostril bid, increase to 2 sprays tid if symptoms persist" → daily_frequency: 2.5, dose_per_administration: 2.5
+            - "1 spray daily alternating nostrils, take with calcium supplement" → daily_frequency: 1.0, dose_per_administration: 1.0
+            - "1 spray one nostril for severe pain, may repeat in 60-90 min if inadequate relief" → daily_frequency: 1.0, dose_per_administration: 1.0, is_prn: true
+            - "2 sprays each nostril daily for maintenance, may use 4 sprays during flare-ups" → daily_frequency: 1.0, dose_per_administration: 4.0
+
+            Key parsing rules:
+            - "each nostril" or "both nostrils" or "bilat nares" = multiply dose by 2
+            - "per nostril" = multiply dose by 2
+            - "morning and evening/night" = BID (2x daily)
+            - "qhs" = once daily at bedtime
+            - "bid" = twice daily
+            - "tid" = three times daily
+            - "qid" = four times daily
+            - "q6h" = every 6 hours = 4x daily
+            - "q8h" = every 8 hours = 3x daily
+            - "q12h" = every 12 hours = 2x daily
+            - "prn" or "when needed" or "as needed" = PRN medication
+            - "may repeat" = PRN medication
+            - For PRN: estimate conservative usage (50% of max frequency)
+
+            Extract:
+            - daily_frequency: How many times per day (consider PRN reduction)
+            - dose_per_administration: Total amount per dose (include both nostrils if specified)
+            - is_prn: True if PRN/as needed
+            - route: "nasal", "inhaled", "oral", etc.
+            - standardized_directions: Clean, professional version
+            - confidence: Your confidence in the parsing (0.0-1.0)
+            - suggested_day_supply: Calculate day supply using the drug data (optional)
+            - calculation_notes: Explain your day supply calculation (optional)
+
+            For day supply calculation (if drug data provided):
+            - For nasal sprays: Total sprays in package ÷ (dose_per_administration × daily_frequency)
+            - For oral inhalers: Total puffs in package ÷ (dose_per_administration × daily_frequency)
+            - For insulin: Total units in package ÷ (dose_per_administration × daily_frequency), limited by beyond use date
+            - Consider PRN medications use ~50% of calculated frequency
+            - Apply discard dates and beyond use dates as limits
+
+            Be conservative with PRN medications - estimate lower usage for safety.
+
+            IMPORTANT: Respond with valid JSON only. Example format:
+            {
+                "daily_frequency": 2.0,
+                "dose_per_administration": 2.0,
+                "is_prn": false,
+                "route": "inhaled",
+                "standardized_directions": "Inhale 2 puffs twice daily",
+                "confidence": 0.9
+            }
+            """
+
+# Wrapping for several sigs parsed in one prompt: each numbered prescription
+# is the single-sig prompt's subject, followed once by _SIG_PROMPT_RULES
+_SIG_BATCH_PROMPT_HEAD = """
+You are an expert PAAS National pharmacy technician. Parse each numbered prescription SIG below accurately using PAAS standards. Drug information listed under a prescription applies to that prescription only.
+"""
+_SIG_BATCH_PROMPT_TAIL = """
+            Apply these rules to every numbered prescription above. Respond with valid JSON only: an object whose "results" array holds one object in the example format per prescription, in the same order, e.g. {"results": [{...prescription 1...}, {...prescription 2...}]}
+            """
+
+# Drug data lines for the sig prompt, chosen by the first marker field present
+# in the drug's row: (template, ((field, default), ...)) per line
+_PROMPT_DRUG_FIELDS = (
+    # Nasal inhaler data
+    (
+        "Max_Total_Sprays",
+        (
+            (
+                "Package Size: {} {}",
+                (("Package_Size_Value", "N/A"), ("Package_Size_Unit", "")),
+            ),
+            ("Total Sprays in Package: {}", (("Max_Total_Sprays", "N/A"),)),
+            ("Dosing Information: {}", (("Dosing_Information", "N/A"),)),
+            (
+                "Example Day Supply Scenarios: {}",
+                (("Example_Days_Supply_Scenarios", "N/A"),),
+            ),
+        ),
+    ),
+    # Oral inhaler data
+    (
+        "Retail_Puffs_per_Package",
+        (
+            (
+                "Package Size: {} {}",
+                (("Retail_Package_Value", "N/A"), ("Retail_Package_Unit", "")),
+            ),
+            ("Puffs per Package: {}", (("Retail_Puffs_per_Package", "N/A"),)),
+            (
+                "Discard After Opening: {} days",
+                (("Discard_After_Opening_Days", "N/A"),),
+            ),
+            (
+                "Example Day Supply Scenarios: {}",
+                (("Example_Days_Supply_Scenarios", "N/A"),),
+            ),
+        ),
+    ),
+    # Insulin data
+    (
+        "Total_Units_per_Package",
+        (
+            ("Dosage Form: {}", (("Dosage_Form", "N/A"),)),
+            ("Units per mL: {}", (("Units_per_mL", "N/A"),)),
+            ("Total Units per Package: {}", (("Total_Units_per_Package", "N/A"),)),
+            ("Beyond Use Date: {} days", (("Beyond_Use_Date_Days", "N/A"),)),
+        ),
+    ),
+    # Diabetic injectable data
+    (
+        "Analog_Name",
+        (
+            ("Class: {}", (("Class", "N/A"),)),
+            ("Analog Name: {}", (("Analog_Name", "N/A"),)),
+            ("Dosage Form: {}", (("Dosage_Form", "N/A"),)),
+            (
+                "Strength: {} {}",
+                (("Strength_Value", "N/A"), ("Strength_Unit", "N/A")),
+            ),
+            (
+                "Expiration After Opening: {} days",
+                (("Expiration_After_Opening_Days", "N/A"),),
+            ),
+        ),
+    ),
+)
+
+
+def _prompt_block(lines) -> str:
+    """Indented prompt lines, laid out as the prompt's triple-quoted blocks"""
+    return "\n" + "".join(f"            {line}\n" for line in lines) + "            "
+
+
+def _llm_cache_key(model: str, *parts: str) -> bytes:
+    """LLM cache key for a request to model made from parts"""
+    return hashlib.sha256("\0".join((model,) + parts).encode()).digest()
+
+
+def _normalize_llm_text(text: str) -> str:
+    """Casefolded, whitespace-collapsed form of a sig or drug name for LLM
+    cache keys, so spellings differing only in those share one answer"""
+    return " ".join(text.casefold().split())
+
+
+def _llm_sig_cache_key(model: str, sig: str, drug_info_text: str) -> bytes:
+    """LLM cache key for parsing sig with the given prompt drug information"""
+    return _llm_cache_key(model, "sig", _normalize_llm_text(sig), drug_info_text)
+
+
+def _unwrap_json_reply(response_text: str) -> str:
+    """The JSON of an LLM reply
+
+    JSON mode replies are bare JSON; this unwraps a markdown code block from
+    endpoints that ignore response_format.
+    """
+    if not response_text.startswith("{"):
+        json_match = _JSON_CODE_BLOCK_RE.search(response_text)
+        if json_match:
+            return json_match.group(1)
+    return response_text
+
+
+def _llm_sig_result(result_dict: Dict[str, Any], sig: str) -> Dict[str, Any]:
+    """Sig parse from the JSON object of an LLM reply"""
+    # Build return dictionary with reasonable defaults
+    llm_result = {
+        "frequency": float(result_dict.get("daily_frequency", 1.0)),
+        "dose": float(result_dict.get("dose_per_administration", 1.0)),
+        "is_prn": bool(result_dict.get("is_prn", False)),
+        "route": str(result_dict.get("route", "oral")),
+        "standardized": str(result_dict.get("standardized_directions", sig)),
+    }
+
+    # Add enhanced fields if available
+    if result_dict.get("suggested_day_supply"):
+        llm_result["suggested_day_supply"] = int(result_dict["suggested_day_supply"])
+
+    if result_dict.get("calculation_notes"):
+        llm_result["calculation_notes"] = str(result_dict["calculation_notes"])
+
+    return llm_result
+
+
+# Batches smaller than this run the serial kernel; thread start-up costs more
+# than it saves on tiny inputs
+_PARALLEL_BATCH_THRESHOLD = 1024
+
+# Distinct drug names scored per rapidfuzz.process.cdist call in batch matching
+_CDIST_CHUNK_SIZE = 4096
+
+# Rule-based results kept per extractor for repeated prescriptions
+_RESULT_CACHE_SIZE = 4096
+
+
+def _fallback_quantity(quantity: Union[str, int, float]) -> float:
+    """Quantity reported when processing fails: the prescribed quantity if it
+    is a finite number, else 1"""
+    try:
+        value = float(quantity)
+    except (TypeError, ValueError):
+        return 1.0
+    return value if math.isfinite(value) else 1.0
+
+
+def _clamp_day_supply(days: Union[int, float]) -> Union[int, float]:
+    """Day supply bounded to 7-365 days; same result as max(7, min(days, 365))
+    without the builtin call overhead"""
+    if days > 365:
+        return 365
+    if days > 7:
+        return days
+    return 7
+
+
+def _clean_drug_name(name: str) -> str:
+    """Drug name in the casefolded, stripped form used for database keys"""
+    return name.casefold().strip()
+
+
+def _sort_tokens(text: str) -> str:
+    """Whitespace tokens of text in sorted order, as token_sort_ratio compares"""
+    return " ".join(sorted(text.split()))
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_scenarios(text: str) -> Any:
+    """Decode a scenario cell, {} if it is not valid JSON
+
+    Cached: the cells come from the packaged tables, so there are only as many
+    distinct texts as table rows, and each is parsed once per process. The
+    result is shared and must not be mutated.
+    """
     try:
+        return json.loads(text.replace("'", '"'))
+    except Exception:
+        return {}
+
+
+def _coerce_scenarios(value: Any) -> Any:
+    """Example_Days_Supply_Scenarios cell as parsed JSON, {} if unusable
+
+    The cell stays a string in the drug data, since that is what the LLM
+    prompt and additional_info show. Single quotes are swapped for double
+    quotes before decoding.
+    """
+    if isinstance(value, str):
+        return _parse_scenarios(value)
+    if not isinstance(value, dict):
+        # Handle NaN or other invalid types
+        return {}
+    return value
+
+
+@njit(cache=True)
+def _compute_day_supply(
+    quantity: float,
+    package_size: float,
+    dose_per_admin: float,
+    admins_per_day: float,
+    default_days: float,
+) -> float:
+    """Days covered by quantity x package_size at dose_per_admin x admins_per_day"""
+    daily_usage = dose_per_admin * admins_per_day
+    if daily_usage > 0:
+        return quantity * package_size / daily_usage
+    return default_days
+
+
+@njit(cache=True)
+def _compute_injectable_days(
+    quantity: float, admins_per_day: float, schedule_days: float
+) -> float:
+    """Days covered by quantity doses given every schedule_days days, or at
+    admins_per_day doses per day when schedule_days is 0 (30 without either)"""
+    if schedule_days > 0:
+        return quantity * schedule_days
+    if admins_per_day > 0:
+        return quantity / admins_per_day
+    return 30.0
+
+
+def _day_supply_loop(quantities, package_sizes, doses, admins, default_days):
+    """Array form of _compute_day_supply, compiled serial and parallel below"""
+    n = quantities.shape[0]
+    out = np.empty(n, dtype=np.float64)
+    for i in prange(n):
+        daily_usage = doses[i] * admins[i]
+        if daily_usage > 0:
+            out[i] = quantities[i] * package_sizes[i] / daily_usage
+        else:
+            out[i] = default_days
+    return out
+
+
+_compute_day_supply_serial = njit(cache=True)(_day_supply_loop)
+_compute_day_supply_vec = njit(cache=True, parallel=True)(_day_supply_loop)
+
+
+def _compute_day_supplies(
+    quantities: np.ndarray,
+    package_sizes: np.ndarray,
+    doses: np.ndarray,
+    admins: np.ndarray,
+    default_days: float = 30.0,
+) -> np.ndarray:
+    """Compute unclamped day supplies for a batch of float64 arrays"""
+    if not NUMBA_AVAILABLE:
+        # Silent on divide by zero, NaN and overflow, like the kernels
+        with np.errstate(all="ignore"):
+            daily_usage = doses * admins
+            days = quantities * package_sizes / daily_usage
+        return np.where(daily_usage > 0, days, default_days)
+    if quantities.shape[0] > _PARALLEL_BATCH_THRESHOLD:
+        kernel = _compute_day_supply_vec
+    else:
+        kernel = _compute_day_supply_serial
+    return kernel(quantities, package_sizes, doses, admins, float(default_days))
+
+
+@functools.lru_cache(maxsize=None)
+def _read_data_file(filename: str) -> pd.DataFrame:
+    """Parse a packaged data file once per process
+
+    The returned frame is shared by every extractor and must not be mutated.
+    """
+    if files is not None:
+        # Modern approach using importlib.resources (Python 3.9+)
+        data_file = files("paas_extractor") / "data" / filename
+        with data_file.open("r") as f:
+            return pd.read_csv(f)
+    else:
+        # Fallback to pkg_resources for older Python versions
         import pkg_resources
 
-        files = None
-    except ImportError:
-        pkg_resources = None
-        files = None
+        data_path = pkg_resources.resource_filename(
+            "paas_extractor", f"data/{filename}"
+        )
+        return pd.read_csv(data_path)
+
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+# LLM Helper Models (only available if optional dependencies installed)
+_LLM_OUTPUT_MODELS = frozenset(
+    {"SigParsingOutput", "DrugSearchOutput", "EnhancedSigParsingOutput"}
 )
-logger = logging.getLogger(__name__)
 
 
-# LLM Helper Models (only available if optional dependencies installed)
-if LLM_AVAILABLE:
+@functools.lru_cache(maxsize=None)
+def _llm_output_models() -> Dict[str, type]:
+    """Define the pydantic output models, importing pydantic on first use"""
+    from pydantic import BaseModel, Field
 
     class SigParsingOutput(BaseModel):
         """Structured output for LLM-based sig parsing"""
@@ -107,6 +988,19 @@ if LLM_AVAILABLE:
             description="Notes about the day supply calculation", default=None
         )
 
+    return {
+        "SigParsingOutput": SigParsingOutput,
+        "DrugSearchOutput": DrugSearchOutput,
+        "EnhancedSigParsingOutput": EnhancedSigParsingOutput,
+    }
+
+
+def __getattr__(name):
+    """Define the LLM output models on first access (PEP 562)"""
+    if name in _LLM_OUTPUT_MODELS and LLM_AVAILABLE:
+        return _llm_output_models()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 class MedicationType(Enum):
     """Enumeration of medication types"""
@@ -122,10 +1016,37 @@ class MedicationType(Enum):
     UNKNOWN = "unknown"
 
 
+# Words in a drug name (package sizes, forms, audiences) that send even a
+# confident match to the LLM name search
+_LLM_NAME_SEARCH_RE = re.compile(r"ml|gm|bottle|container|children|nasal|spray")
+
+# Medication types whose processors send the LLM the sig with the drug's data
+_LLM_SIG_DRUG_TYPES = frozenset(
+    {
+        MedicationType.NASAL_INHALER,
+        MedicationType.ORAL_INHALER,
+        MedicationType.INSULIN,
+        MedicationType.DIABETIC_INJECTABLE,
+    }
+)
+# Medication types whose processors send the LLM the sig alone
+_LLM_SIG_ONLY_TYPES = frozenset(
+    {
+        MedicationType.BIOLOGIC_INJECTABLE,
+        MedicationType.NONBIOLOGIC_INJECTABLE,
+        MedicationType.EYEDROP,
+        MedicationType.TOPICAL,
+    }
+)
+
+
 @dataclass
 class PrescriptionInput:
     """Input prescription data structure"""
 
+    # Declared by hand: dataclass(slots=True) needs Python 3.10
+    __slots__ = ("drug_name", "quantity", "sig_directions")
+
     drug_name: str
     quantity: Union[str, int, float]
     sig_directions: str
@@ -135,6 +1056,18 @@ class PrescriptionInput:
 class ExtractedData:
     """Output structure for extracted prescription data"""
 
+    __slots__ = (
+        "original_drug_name",
+        "matched_drug_name",
+        "medication_type",
+        "corrected_quantity",
+        "calculated_day_supply",
+        "standardized_sig",
+        "confidence_score",
+        "warnings",
+        "additional_info",
+    )
+
     original_drug_name: str
     matched_drug_name: str
     medication_type: MedicationType
@@ -143,12 +1076,141 @@ class ExtractedData:
     standardized_sig: str
     confidence_score: float
     warnings: List[str]  # Always empty in perfect version
-    additional_info: Dict[str, any]
+    additional_info: Dict[str, Any]
+
+
+def _copy_result(result: ExtractedData) -> ExtractedData:
+    """Copy of a cached result whose mutable fields the caller may change"""
+    return dataclass_replace(
+        result,
+        warnings=list(result.warnings),
+        additional_info=dict(result.additional_info),
+    )
+
+
+@dataclass
+class BatchExtractedData:
+    """Columnar (one array per field) output of batch extraction
+
+    Element i of every field describes the i-th input prescription.
+    """
+
+    original_drug_name: np.ndarray  # object
+    matched_drug_name: np.ndarray  # object, None for unsupported drugs
+    medication_type: np.ndarray  # object, MedicationType members
+    corrected_quantity: np.ndarray  # float64
+    calculated_day_supply: np.ndarray  # int64
+    standardized_sig: np.ndarray  # object
+    confidence_score: np.ndarray  # float64
+    warnings: List[List[str]]
+    additional_info: List[Dict[str, Any]]
+
+    def __len__(self) -> int:
+        return len(self.original_drug_name)
+
+    def to_list(self) -> List[ExtractedData]:
+        """Convert to one ExtractedData per prescription"""
+        return [
+            ExtractedData(
+                original_drug_name=self.original_drug_name[i],
+                matched_drug_name=self.matched_drug_name[i],
+                medication_type=self.medication_type[i],
+                corrected_quantity=float(self.corrected_quantity[i]),
+                calculated_day_supply=int(self.calculated_day_supply[i]),
+                standardized_sig=self.standardized_sig[i],
+                confidence_score=float(self.confidence_score[i]),
+                warnings=self.warnings[i],
+                additional_info=self.additional_info[i],
+            )
+            for i in range(len(self))
+        ]
+
+    def to_frame(self, index: Optional[pd.Index] = None) -> pd.DataFrame:
+        """Convert to a DataFrame with one column per field
+
+        Pass the index of the frame the inputs came from to join the
+        results back onto it.
+        """
+        return pd.DataFrame(
+            {field.name: getattr(self, field.name) for field in dataclass_fields(self)},
+            index=index,
+        )
 
 
 class PrescriptionDataExtractor:
     """Perfect prescription data extraction - no warnings, 100% success"""
 
+    # Attributes built from the packaged data by _load_reference_data
+    _SHARED_ATTRIBUTES = (
+        "nasal_inhalers",
+        "oral_inhalers",
+        "insulin_products",
+        "biologic_injectables",
+        "nonbiologic_injectables",
+        "diabetic_injectables",
+        "drug_database",
+        "_drug_names",
+        "_drug_names_norm",
+        "_drug_names_by_sorted_tokens",
+        "_drug_name_index",
+        "_insulin_total_units",
+        "_insulin_beyond_use_days",
+        "_name_trie",
+        "_suffix_owners",
+        "_suffix_trie",
+    )
+    # How each medication table feeds the drug database: attribute, medication
+    # type, name column, optional generic name column and optional brand alias
+    # table with its compiled pattern
+    _DRUG_TABLES = (
+        (
+            "nasal_inhalers",
+            MedicationType.NASAL_INHALER,
+            "Drug_Name",
+            None,
+            (_NASAL_INHALER_ALIASES, _NASAL_INHALER_ALIAS_RE),
+        ),
+        (
+            "oral_inhalers",
+            MedicationType.ORAL_INHALER,
+            "Brand_Name",
+            None,
+            (_ORAL_INHALER_ALIASES, _ORAL_INHALER_ALIAS_RE),
+        ),
+        (
+            "insulin_products",
+            MedicationType.INSULIN,
+            "Proprietary_Name",
+            "Proper_Name",
+            None,
+        ),
+        (
+            "biologic_injectables",
+            MedicationType.BIOLOGIC_INJECTABLE,
+            "Proprietary_Name",
+            "Proper_Name",
+            None,
+        ),
+        (
+            "nonbiologic_injectables",
+            MedicationType.NONBIOLOGIC_INJECTABLE,
+            "Proprietary_Name",
+            "Proper_Name",
+            None,
+        ),
+        (
+            "diabetic_injectables",
+            MedicationType.DIABETIC_INJECTABLE,
+            "Proprietary_Name",
+            "Analog_Name",
+            None,
+        ),
+    )
+    # The package data never changes, so those attributes are built once per
+    # class and shared by its instances (read-only). Keyed by class so a
+    # subclass overriding a loader gets its own copy.
+    _shared_data: Dict[type, Dict[str, Any]] = {}
+
     def __init__(
         self, llm_api_key: Optional[str] = None, llm_base_url: Optional[str] = None
     ):
@@ -163,6 +1225,8 @@ class PrescriptionDataExtractor:
         self.llm_client = None
         if llm_api_key and LLM_AVAILABLE:
             try:
+                from openai import OpenAI
+
                 self.llm_client = OpenAI(
                     api_key=llm_api_key,
                     base_url=llm_base_url or "https://api.openai.com/v1",
@@ -173,39 +1237,179 @@ class PrescriptionDataExtractor:
                 logger.warning(f"Failed to initialize LLM client: {e}")
         elif llm_api_key and not LLM_AVAILABLE:
             logger.warning(
-                "LLM API key provided but required packages not installed. Install with: pip install openai pydantic tenacity"
+                "LLM API key provided but required packages not installed. Install with: pip install openai pydantic"
             )
+        self._llm_cache: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._llm_cache_lock = threading.Lock()
+        self._result_cache: "OrderedDict[Tuple[Any, ...], ExtractedData]" = (
+            OrderedDict()
+        )
+        self._result_cache_lock = threading.Lock()
+
+        cls = type(self)
+        shared = cls._shared_data.get(cls)
+        if shared is None:
+            self._load_reference_data()
+            shared = {name: getattr(self, name) for name in self._SHARED_ATTRIBUTES}
+            # Do not pin a partial load (a table that failed to read is empty)
+            if not any(
+                isinstance(value, pd.DataFrame) and value.empty
+                for value in shared.values()
+            ):
+                cls._shared_data[cls] = shared
+        else:
+            self.__dict__.update(shared)
 
+    def _load_reference_data(self):
+        """Load the medication tables behind the drug database and build it
+        along with the name indexes"""
         self.nasal_inhalers = self._load_nasal_inhalers()
         self.oral_inhalers = self._load_oral_inhalers()
         self.insulin_products = self._load_insulin_products()
         self.biologic_injectables = self._load_biologic_injectables()
         self.nonbiologic_injectables = self._load_nonbiologic_injectables()
-        self.eyedrop_guidelines = self._load_eyedrop_guidelines()
-        self.eyedrop_beyond_use = self._load_eyedrop_beyond_use()
-        self.ftu_dosing = self._load_ftu_dosing()
         self.diabetic_injectables = self._load_diabetic_injectables()
-        self.insulin_pen_increments = self._load_insulin_pen_increments()
 
         # Create comprehensive drug name mapping
         self.drug_database = self._create_drug_database()
+        # Frozen candidate names, plus their RapidFuzz-normalized forms, so the
+        # matcher does no per-call preprocessing of the database side
+        self._drug_names = tuple(self.drug_database.keys())
+        self._drug_names_norm = tuple(
+            utils.default_process(name) for name in self._drug_names
+        )
+        # Token-sorted normalized names -> first position, for names written
+        # with the same words in another order
+        self._drug_names_by_sorted_tokens: Dict[str, int] = {}
+        for i, name in enumerate(self._drug_names_norm):
+            self._drug_names_by_sorted_tokens.setdefault(_sort_tokens(name), i)
+        # Substring index: a trie of the names finds those contained in the
+        # input, and a trie of every name suffix (mapped back to the owning
+        # name positions) finds those containing it
+        self._drug_name_index = {name: i for i, name in enumerate(self._drug_names)}
+        # Insulin package columns by name position, gathered by the batch
+        # insulin kernel instead of reading each row's dict
+        insulin_data = [
+            entry["data"] if entry["type"] == MedicationType.INSULIN else {}
+            for entry in self.drug_database.values()
+        ]
+        self._insulin_total_units = np.array(
+            [data.get("Total_Units_per_Package", 0) for data in insulin_data],
+            dtype=np.float64,
+        )
+        self._insulin_beyond_use_days = np.array(
+            [data.get("Beyond_Use_Date_Days", 28) for data in insulin_data],
+            dtype=np.float64,
+        )
+        self._name_trie = marisa_trie.Trie(self._drug_names)
+        self._suffix_owners: Dict[str, List[int]] = {}
+        for i, name in enumerate(self._drug_names):
+            for start in range(len(name)):
+                self._suffix_owners.setdefault(name[start:], []).append(i)
+        self._suffix_trie = marisa_trie.Trie(self._suffix_owners)
+
+    # Reference tables only the eyedrop and topical processors read, so they
+    # are loaded on first access
+
+    @functools.cached_property
+    def eyedrop_guidelines(self) -> pd.DataFrame:
+        """PBM eyedrop guidelines"""
+        return self._load_eyedrop_guidelines()
+
+    @functools.cached_property
+    def eyedrop_beyond_use(self) -> pd.DataFrame:
+        """Eyedrop beyond use dates"""
+        return self._load_eyedrop_beyond_use()
+
+    @functools.cached_property
+    def ftu_dosing(self) -> pd.DataFrame:
+        """FTU dosing guide"""
+        return self._load_ftu_dosing()
+
+    @functools.cached_property
+    def insulin_pen_increments(self) -> pd.DataFrame:
+        """Insulin pen dosing increments"""
+        return self._load_insulin_pen_increments()
+
+    @functools.cached_property
+    def _eyedrop_pbm_defaults(self) -> Optional[pd.Series]:
+        """Guideline row for PAAS National Default (else the first PBM), or
+        None without guidelines"""
+        guidelines = self.eyedrop_guidelines
+        if guidelines.empty:
+            return None
+        defaults = guidelines[guidelines["PBM"] == "PAAS National Default"]
+        return (guidelines if defaults.empty else defaults).iloc[0]
+
+    @functools.cached_property
+    def _eyedrop_beyond_use_days(self) -> Tuple[Tuple[str, Any], ...]:
+        """(lowercased product name, beyond use days) pairs in table order"""
+        beyond_use = self.eyedrop_beyond_use
+        if beyond_use.empty:
+            return ()
+        return tuple(
+            (product.lower(), days)
+            for product, days in zip(
+                beyond_use["Product_Name"], beyond_use["Beyond_Use_Date_Days"]
+            )
+            if isinstance(product, str)
+        )
+
+    @functools.cached_property
+    def _ftu_areas(self) -> Tuple[Tuple[str, Any, Any, Any], ...]:
+        """(lowercased treatment area, QD, BID, TID grams per day) rows in
+        table order"""
+        ftu = self.ftu_dosing
+        if ftu.empty:
+            return ()
+        return tuple(
+            (area.lower(), qd, bid, tid)
+            for area, qd, bid, tid in zip(
+                ftu["Treatment_Area"],
+                ftu["Grams_per_Day_QD"],
+                ftu["Grams_per_Day_BID"],
+                ftu["Grams_per_Day_TID"],
+            )
+        )
+
+    @functools.cached_property
+    def _processors(
+        self,
+    ) -> Dict[
+        MedicationType,
+        Callable[[Dict, float, str, Optional[str]], Tuple[float, int, str]],
+    ]:
+        """Processor for each medication type, called as
+        processor(drug_data, quantity, sig, matched_name)"""
+        return {
+            MedicationType.NASAL_INHALER: self._process_nasal_inhaler,
+            MedicationType.ORAL_INHALER: self._process_oral_inhaler,
+            MedicationType.INSULIN: self._process_insulin,
+            MedicationType.DIABETIC_INJECTABLE: self._process_diabetic_injectable,
+            MedicationType.BIOLOGIC_INJECTABLE: (
+                lambda drug_data, quantity, sig, _: self._process_injectable(
+                    drug_data, quantity, sig, is_biologic=True
+                )
+            ),
+            MedicationType.NONBIOLOGIC_INJECTABLE: (
+                lambda drug_data, quantity, sig, _: self._process_injectable(
+                    drug_data, quantity, sig, is_biologic=False
+                )
+            ),
+            MedicationType.EYEDROP: (
+                lambda _, quantity, sig, matched_name: self._process_eyedrop(
+                    matched_name, quantity, sig
+                )
+            ),
+            MedicationType.TOPICAL: (
+                lambda _, quantity, sig, __: self._process_topical_ftu(quantity, sig)
+            ),
+        }
 
     def _load_data_file(self, filename: str) -> pd.DataFrame:
         """Load data file using modern importlib.resources or fallback to pkg_resources"""
         try:
-            if files is not None:
-                # Modern approach using importlib.resources (Python 3.9+)
-                data_files = files("paas_extractor") / "data" / filename
-                with data_files.open("r") as f:
-                    return pd.read_csv(f)
-            else:
-                # Fallback to pkg_resources for older Python versions
-                import pkg_resources
-
-                data_path = pkg_resources.resource_filename(
-                    "paas_extractor", f"data/{filename}"
-                )
-                return pd.read_csv(data_path)
+            return _read_data_file(filename)
         except Exception as e:
             logger.warning(f"Could not load {filename}: {e}")
             return pd.DataFrame()
@@ -250,200 +1454,215 @@ class PrescriptionDataExtractor:
         """Load insulin pen dosing increments"""
         return self._load_data_file("insulin_pen_dosing_increments.csv")
 
+    @staticmethod
+    def _keyed_records(df: pd.DataFrame, name_col: str) -> List[Tuple[str, Dict]]:
+        """Pair each row's normalized name with the row as a plain dict
+
+        Names are casefolded and stripped as whole columns and the rows are
+        converted with one to_dict call instead of an iterrows pass. Names are
+        interned since they become the long-lived drug database keys.
+        """
+        keys = df[name_col].astype(str).str.casefold().str.strip().tolist()
+        return list(zip(map(sys.intern, keys), df.to_dict(orient="records")))
+
+    @staticmethod
+    def _generic_names(df: pd.DataFrame, name_col: str) -> List[Optional[str]]:
+        """Normalized per-row names from an optional name column
+
+        Blank cells (NaN or whitespace only) are masked once for the whole
+        column and come back as None.
+        """
+        names = df[name_col].astype(str).str.casefold().str.strip()
+        present = df[name_col].notna() & names.ne("")
+        return [
+            sys.intern(name) if keep else None
+            for name, keep in zip(names.tolist(), present.tolist())
+        ]
+
+    @staticmethod
+    def _brand_aliases(
+        drug_name: str,
+        alias_table: Tuple[Tuple[str, Tuple[str, ...]], ...],
+        alias_re: re.Pattern,
+    ) -> Tuple[str, ...]:
+        """Aliases of the first literal in alias_table that drug_name contains"""
+        if alias_re.search(drug_name) is None:
+            return ()
+        for literal, aliases in alias_table:
+            if literal in drug_name:
+                return aliases
+        return ()
+
     def _create_drug_database(self) -> Dict[str, Dict]:
-        """Create comprehensive drug name database for matching"""
-        database = {}
-
-        # Add nasal inhalers
-        if not self.nasal_inhalers.empty:
-            for _, row in self.nasal_inhalers.iterrows():
-                drug_name = str(row["Drug_Name"]).lower().strip()
-                database[drug_name] = {
-                    "type": MedicationType.NASAL_INHALER,
-                    "data": row.to_dict(),
-                }
+        """Create comprehensive drug name database for matching
+
+        All keys for one row (name, generic name, brand aliases) share a single
+        entry dict. The (key, entry) pairs are collected first and the dict is
+        built from them in one call; a later pair for the same key replaces the
+        earlier entry but keeps its position, as repeated assignment would.
+        """
+        pairs: List[Tuple[str, Dict]] = []
+
+        for attr, medication_type, name_col, generic_col, aliases in self._DRUG_TABLES:
+            df = getattr(self, attr)
+            if df.empty:
+                continue
+            generic_names = (
+                self._generic_names(df, generic_col)
+                if generic_col
+                else [None] * len(df)
+            )
+            for (drug_name, record), generic_name in zip(
+                self._keyed_records(df, name_col), generic_names
+            ):
+                entry = {"type": medication_type, "data": record}
+                pairs.append((drug_name, entry))
+
+                # Add by generic name
+                if generic_name is not None and generic_name != drug_name:
+                    pairs.append((generic_name, entry))
 
                 # Add common brand name aliases
-                if "fluticasone propionate" in drug_name:
-                    database["flonase"] = {
-                        "type": MedicationType.NASAL_INHALER,
-                        "data": row.to_dict(),
-                    }
-                elif "mometasone furoate" in drug_name:
-                    database["nasonex"] = {
-                        "type": MedicationType.NASAL_INHALER,
-                        "data": row.to_dict(),
-                    }
-                elif "triamcinolone acetonide" in drug_name:
-                    database["nasacort"] = {
-                        "type": MedicationType.NASAL_INHALER,
-                        "data": row.to_dict(),
-                    }
-                elif "azelastine" in drug_name:
-                    database["astelin"] = {
-                        "type": MedicationType.NASAL_INHALER,
-                        "data": row.to_dict(),
-                    }
-                    database["astepro"] = {
-                        "type": MedicationType.NASAL_INHALER,
-                        "data": row.to_dict(),
-                    }
-
-        # Add oral inhalers
-        if not self.oral_inhalers.empty:
-            for _, row in self.oral_inhalers.iterrows():
-                drug_name = str(row["Brand_Name"]).lower().strip()
-                database[drug_name] = {
-                    "type": MedicationType.ORAL_INHALER,
-                    "data": row.to_dict(),
-                }
-
-                # Add common aliases and generic names
-                if "albuterol hfa" in drug_name:
-                    database["albuterol"] = {
-                        "type": MedicationType.ORAL_INHALER,
-                        "data": row.to_dict(),
-                    }
-                    database["proair"] = {
-                        "type": MedicationType.ORAL_INHALER,
-                        "data": row.to_dict(),
-                    }
-                    database["proventil"] = {
-                        "type": MedicationType.ORAL_INHALER,
-                        "data": row.to_dict(),
-                    }
-                elif "symbicort hfa" in drug_name:
-                    database["symbicort"] = {
-                        "type": MedicationType.ORAL_INHALER,
-                        "data": row.to_dict(),
-                    }
-                    database["symbicort hfa budesonide"] = {
-                        "type": MedicationType.ORAL_INHALER,
-                        "data": row.to_dict(),
-                    }
-                elif "ventolin" in drug_name:
-                    database["albuterol"] = {
-                        "type": MedicationType.ORAL_INHALER,
-                        "data": row.to_dict(),
-                    }
-
-        # Add insulin products
-        if not self.insulin_products.empty:
-            for _, row in self.insulin_products.iterrows():
-                # Add by Proprietary_Name
-                proprietary_name = str(row["Proprietary_Name"]).lower().strip()
-                database[proprietary_name] = {
-                    "type": MedicationType.INSULIN,
-                    "data": row.to_dict(),
-                }
-
-                # Add by Proper_Name (generic name)
-                if pd.notna(row["Proper_Name"]) and str(row["Proper_Name"]).strip():
-                    proper_name = str(row["Proper_Name"]).lower().strip()
-                    if proper_name != proprietary_name:
-                        database[proper_name] = {
-                            "type": MedicationType.INSULIN,
-                            "data": row.to_dict(),
-                        }
-
-        # Add biologic injectables
-        if not self.biologic_injectables.empty:
-            for _, row in self.biologic_injectables.iterrows():
-                # Add by Proprietary_Name
-                proprietary_name = str(row["Proprietary_Name"]).lower().strip()
-                database[proprietary_name] = {
-                    "type": MedicationType.BIOLOGIC_INJECTABLE,
-                    "data": row.to_dict(),
-                }
-
-                # Add by Proper_Name (generic name)
-                if pd.notna(row["Proper_Name"]) and str(row["Proper_Name"]).strip():
-                    proper_name = str(row["Proper_Name"]).lower().strip()
-                    if proper_name != proprietary_name:
-                        database[proper_name] = {
-                            "type": MedicationType.BIOLOGIC_INJECTABLE,
-                            "data": row.to_dict(),
-                        }
-
-        # Add non-biologic injectables
-        if not self.nonbiologic_injectables.empty:
-            for _, row in self.nonbiologic_injectables.iterrows():
-                # Add by Proprietary_Name
-                proprietary_name = str(row["Proprietary_Name"]).lower().strip()
-                database[proprietary_name] = {
-                    "type": MedicationType.NONBIOLOGIC_INJECTABLE,
-                    "data": row.to_dict(),
-                }
-
-                # Add by Proper_Name (generic name)
-                if pd.notna(row["Proper_Name"]) and str(row["Proper_Name"]).strip():
-                    proper_name = str(row["Proper_Name"]).lower().strip()
-                    if proper_name != proprietary_name:
-                        database[proper_name] = {
-                            "type": MedicationType.NONBIOLOGIC_INJECTABLE,
-                            "data": row.to_dict(),
-                        }
-
-        # Add diabetic injectables
-        if not self.diabetic_injectables.empty:
-            for _, row in self.diabetic_injectables.iterrows():
-                # Add by Proprietary_Name
-                proprietary_name = str(row["Proprietary_Name"]).lower().strip()
-                database[proprietary_name] = {
-                    "type": MedicationType.DIABETIC_INJECTABLE,
-                    "data": row.to_dict(),
-                }
-
-                # Add by Analog_Name (generic/analog name)
-                if pd.notna(row["Analog_Name"]) and str(row["Analog_Name"]).strip():
-                    analog_name = str(row["Analog_Name"]).lower().strip()
-                    if analog_name != proprietary_name:
-                        database[analog_name] = {
-                            "type": MedicationType.DIABETIC_INJECTABLE,
-                            "data": row.to_dict(),
-                        }
-
-        return database
+                if aliases:
+                    pairs.extend(
+                        (alias, entry)
+                        for alias in self._brand_aliases(drug_name, *aliases)
+                    )
+
+        return dict(pairs)
 
     def _fuzzy_match_drug_name(
-        self, input_name: str, threshold: float = 0.6
+        self,
+        input_name: str,
+        threshold: float = 0.6,
+        fuzzy_scores: Optional[np.ndarray] = None,
     ) -> Tuple[Optional[str], float]:
-        """Find best matching drug name using fuzzy string matching"""
-        input_name_clean = input_name.lower().strip()
+        """Find best matching drug name using fuzzy string matching
+
+        Args:
+            input_name: Drug name as written on the prescription
+            threshold: Minimum fuzzy similarity (0-1) to accept
+            fuzzy_scores: Optional precomputed RapidFuzz scores of the name
+                against self._drug_names_norm (one cdist row), used by batch
+                matching instead of scoring the name again
+        """
+        input_name_clean = _clean_drug_name(input_name)
+        # Exact hit: a single dict probe instead of a candidate scan
+        if input_name_clean in self.drug_database:
+            return input_name_clean, 1.0
+
         best_match = None
         best_score = 0
 
-        for drug_name in self.drug_database.keys():
-            # Try exact match first
-            if input_name_clean == drug_name:
-                return drug_name, 1.0
-
-            # Try substring match
-            if input_name_clean in drug_name or drug_name in input_name_clean:
-                # Calculate overlap-based score (always <= 1.0)
-                if input_name_clean in drug_name:
-                    # Input is substring of database entry
-                    score = len(input_name_clean) / len(drug_name)
-                else:
-                    # Database entry is substring of input
-                    score = len(drug_name) / len(input_name_clean)
-
-                # Boost score for substring matches but cap at 0.95
-                score = min(0.95, score + 0.2)
+        for index in self._substring_candidates(input_name_clean):
+            drug_name = self._drug_names[index]
+            # Substring match: calculate overlap-based score (always <= 1.0)
+            if input_name_clean in drug_name:
+                # Input is substring of database entry
+                score = len(input_name_clean) / len(drug_name)
+            else:
+                # Database entry is substring of input
+                score = len(drug_name) / len(input_name_clean)
 
-                if score > best_score:
-                    best_match = drug_name
-                    best_score = score
+            # Boost score for substring matches but cap at 0.95
+            score = min(0.95, score + 0.2)
 
-            # Try fuzzy matching
-            similarity = SequenceMatcher(None, input_name_clean, drug_name).ratio()
-            if similarity > best_score and similarity >= threshold:
+            if score > best_score:
                 best_match = drug_name
-                best_score = similarity
+                best_score = score
+
+        # Fuzzy matching over all names. Only a score above the best substring
+        # hit can win, so let RapidFuzz prune any candidate below it.
+        query = utils.default_process(input_name_clean)
+        if fuzzy_scores is None:
+            score_cutoff = max(threshold, best_score) * 100
+            fuzzy_match = process.extractOne(
+                query,
+                self._drug_names_norm,
+                scorer=fuzz.ratio,
+                score_cutoff=score_cutoff,
+            )
+        else:
+            fuzzy_match = None
+            if len(fuzzy_scores):
+                best_index = int(np.argmax(fuzzy_scores))
+                best_fuzzy = float(fuzzy_scores[best_index])
+                if best_fuzzy >= threshold * 100:
+                    fuzzy_match = (None, best_fuzzy, best_index)
+        # The same words in another order ("glargine insulin" for "insulin
+        # glargine") match exactly. Sorted forms are not fuzzy-scored: sorting
+        # lines quantity and unit words up with the strength and device words
+        # of other names, so "100 units humulin r" would score "humulin r
+        # u-500" above the threshold.
+        sorted_index = self._drug_names_by_sorted_tokens.get(_sort_tokens(query))
+        if sorted_index is not None and (not fuzzy_match or fuzzy_match[1] < 100):
+            fuzzy_match = (None, 100.0, sorted_index)
+        if fuzzy_match and fuzzy_match[1] / 100 > best_score:
+            # Map the normalized choice back to its database key by position
+            best_match = self._drug_names[fuzzy_match[2]]
+            best_score = fuzzy_match[1] / 100
 
         return best_match, best_score
 
-    @retry(stop=stop_after_attempt(2), wait=wait_fixed(1))
+    def _substring_candidates(self, input_name_clean: str) -> List[int]:
+        """Positions in self._drug_names of names that contain, or are
+        contained in, the input, in database order"""
+        hits = set()
+        # Names containing the input start one of their suffixes with it
+        for suffix in self._suffix_trie.keys(input_name_clean):
+            hits.update(self._suffix_owners[suffix])
+        # Names contained in the input are prefixes of one of its suffixes
+        for start in range(len(input_name_clean)):
+            for drug_name in self._name_trie.prefixes(input_name_clean[start:]):
+                hits.add(self._drug_name_index[drug_name])
+        return sorted(hits)
+
+    def _fuzzy_match_drug_names(
+        self, input_names: Sequence[str], threshold: float = 0.6
+    ) -> Dict[str, Tuple[Optional[str], float]]:
+        """Match many drug names at once, keyed by the input name
+
+        Fuzzy scores for all distinct names are computed with
+        rapidfuzz.process.cdist, in chunks to bound the score matrix size.
+        """
+        matches = {}
+        unmatched = []
+        for name in dict.fromkeys(input_names):
+            name_clean = _clean_drug_name(name)
+            # Exact hits need no fuzzy scores
+            if name_clean in self.drug_database:
+                matches[name] = (name_clean, 1.0)
+            else:
+                unmatched.append((name, name_clean))
+
+        for start in range(0, len(unmatched), _CDIST_CHUNK_SIZE):
+            end = start + _CDIST_CHUNK_SIZE
+            chunk = unmatched[start:end]
+            queries = [utils.default_process(name_clean) for _, name_clean in chunk]
+            scores = process.cdist(
+                queries,
+                self._drug_names_norm,
+                scorer=fuzz.ratio,
+                score_cutoff=threshold * 100,
+                dtype=np.float64,
+                workers=-1,
+            )
+            for (name, name_clean), row in zip(chunk, scores):
+                matches[name] = self._fuzzy_match_drug_name(
+                    name_clean, threshold, fuzzy_scores=row
+                )
+        return matches
+
+    def _llm_completion(self, **kwargs):
+        """Create a chat completion, retrying once after a second on failure"""
+        for attempt in range(_LLM_ATTEMPTS):
+            try:
+                return self.llm_client.chat.completions.create(**kwargs)
+            except Exception:
+                if attempt == _LLM_ATTEMPTS - 1:
+                    raise
+                time.sleep(_LLM_RETRY_WAIT_SECONDS)
+
     def _llm_enhance_drug_search(self, drug_name: str) -> Optional[List[str]]:
         """Use LLM to suggest alternative drug names for better database matching"""
         if not self.llm_enabled:
@@ -451,43 +1670,21 @@ class PrescriptionDataExtractor:
 
         try:
             # Enhanced prompt with specific examples from our challenging cases
-            prompt = f"""
-            Given this drug name: "{drug_name}"
-
-            This is a pharmacy database search. Suggest alternative names that might help find this medication.
-
-            Examples of transformations needed:
-            - "30 ml Azelastine" → ["Azelastine", "Azelastine HCl", "Astelin"]
-            - "Butorfanol" → ["Butorphanol", "Butorphanol nasal"]
-            - "Calcitonen salmon" → ["Calcitonin-Salmon", "Calcitonin nasal"]
-            - "nasal steroid spray" → ["Fluticasone", "Flonase", "Mometasone", "Nasonex"]
-            - "Flonase children" → ["Fluticasone propionate", "Qnasl Children"]
-            - "Astelin" → ["Azelastine HCl", "Azelastine"]
-            - "Nasonex" → ["Mometasone furoate"]
-
-            Consider:
-            - Remove volume/quantity prefixes (30ml, 25gm, etc.)
-            - Fix common misspellings
-            - Brand name to generic conversions
-            - Generic to brand name conversions
-            - Add strength variations if relevant
-            - Include nasal/inhaler formulations
-
-            Return 3-5 most likely alternative search terms.
-            """
+            prompt = (
+                f'{_DRUG_SEARCH_PROMPT_HEAD}"{drug_name}"{_DRUG_SEARCH_PROMPT_TAIL}'
+            )
 
-            # Check if using Gemini API
-            base_url_str = (
-                str(self.llm_client.base_url) if self.llm_client.base_url else ""
+            model = self._llm_model()
+            cache_key = _llm_cache_key(
+                model, "drug_search", _normalize_llm_text(drug_name)
             )
-            if "generativelanguage.googleapis.com" in base_url_str:
-                model = "gemini-2.0-flash"
-            else:
-                model = "gpt-4o-mini"
+            cached = self._cached_llm_reply(cache_key)
+            if cached is not None:
+                return cached
 
             # For Gemini, we need to use function calling or structured prompts
             # Let's use a structured prompt approach with JSON schema
-            completion = self.llm_client.chat.completions.create(
+            completion = self._llm_completion(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.0,  # Lower temperature for more consistent results
@@ -499,218 +1696,53 @@ class PrescriptionDataExtractor:
                 response_text = completion.choices[0].message.content.strip()
 
                 try:
-                    import json
-
-                    result = json.loads(response_text)
-
-                    # Validate the response structure
-                    if isinstance(result, dict) and result.get("confidence", 0) > 0.6:
-                        enhanced_names = result.get("enhanced_names", [])
-                        if enhanced_names:
-                            logger.info(
-                                f"LLM enhanced drug search: '{drug_name}' → {enhanced_names}"
-                            )
-                            return enhanced_names
-
-                except (json.JSONDecodeError, KeyError, TypeError) as e:
-                    logger.debug(f"Failed to parse LLM drug search response: {e}")
-
-            return None
-
-        except Exception as e:
-            logger.debug(f"LLM drug search enhancement failed: {e}")
-            return None
-
-    @retry(stop=stop_after_attempt(2), wait=wait_fixed(1))
-    def _llm_parse_sig(
-        self,
-        sig: str,
-        drug_data: Optional[Dict] = None,
-        drug_name: Optional[str] = None,
-    ) -> Optional[Dict[str, float]]:
-        """Use LLM to parse complex or non-standard sig directions"""
-        if not self.llm_enabled:
-            return None
-
-        try:
-            # Build enhanced prompt with drug-specific CSV data
-            drug_info_text = ""
-            if drug_data and drug_name:
-                drug_info_text = f"""
-
-            DRUG INFORMATION FROM DATABASE:
-            Drug Name: {drug_name}
-            """
-                # Add relevant CSV data based on medication type
-                if "Max_Total_Sprays" in drug_data:
-                    # Nasal inhaler data
-                    drug_info_text += f"""
-            Package Size: {drug_data.get('Package_Size_Value', 'N/A')} {drug_data.get('Package_Size_Unit', '')}
-            Total Sprays in Package: {drug_data.get('Max_Total_Sprays', 'N/A')}
-            Dosing Information: {drug_data.get('Dosing_Information', 'N/A')}
-            Example Day Supply Scenarios: {drug_data.get('Example_Days_Supply_Scenarios', 'N/A')}
-            """
-                elif "Retail_Puffs_per_Package" in drug_data:
-                    # Oral inhaler data
-                    drug_info_text += f"""
-            Package Size: {drug_data.get('Retail_Package_Value', 'N/A')} {drug_data.get('Retail_Package_Unit', '')}
-            Puffs per Package: {drug_data.get('Retail_Puffs_per_Package', 'N/A')}
-            Discard After Opening: {drug_data.get('Discard_After_Opening_Days', 'N/A')} days
-            Example Day Supply Scenarios: {drug_data.get('Example_Days_Supply_Scenarios', 'N/A')}
-            """
-                elif "Total_Units_per_Package" in drug_data:
-                    # Insulin data
-                    drug_info_text += f"""
-            Dosage Form: {drug_data.get('Dosage_Form', 'N/A')}
-            Units per mL: {drug_data.get('Units_per_mL', 'N/A')}
-            Total Units per Package: {drug_data.get('Total_Units_per_Package', 'N/A')}
-            Beyond Use Date: {drug_data.get('Beyond_Use_Date_Days', 'N/A')} days
-            """
-                elif "Analog_Name" in drug_data:
-                    # Diabetic injectable data
-                    drug_info_text += f"""
-            Class: {drug_data.get('Class', 'N/A')}
-            Analog Name: {drug_data.get('Analog_Name', 'N/A')}
-            Dosage Form: {drug_data.get('Dosage_Form', 'N/A')}
-            Strength: {drug_data.get('Strength_Value', 'N/A')} {drug_data.get('Strength_Unit', 'N/A')}
-            Expiration After Opening: {drug_data.get('Expiration_After_Opening_Days', 'N/A')} days
-            """
-                else:
-                    # Generic data
-                    for key, value in drug_data.items():
-                        if (
-                            key not in ["type", "data"]
-                            and value
-                            and str(value) != "nan"
-                        ):
-                            drug_info_text += f"""
-            {key.replace('_', ' ').title()}: {value}
-            """
-
-            # Enhanced PAAS-compliant prompt with critical failure fixes
-            prompt = f"""
-You are an expert PAAS National pharmacy technician. Parse this prescription SIG accurately using PAAS standards.
-
-SIG: "{sig}"
-{drug_info_text}
-
-🚨 CRITICAL PAAS COMPLIANCE RULES:
-
-1. IMMEDIATE DISCARD MEDICATIONS (AUTO-INJECTORS):
-   - BCise auto-injector (Bydureon) → 1 day supply (discard immediately)
-   - Single-use pens (Trulicity) → 1 day supply (discard immediately)
-   - Keywords: "auto-injector", "single-use", "immediately after opening"
-   - OVERRIDE calculations for these devices!
-
-2. BEYOND-USE DATE HARD LIMITS:
-   - Xultophy → 21 days maximum (beyond-use date)
-   - Soliqua → 28 days maximum (contains insulin)
-   - Byetta → 30 days maximum (expiration after opening)
-   - Lantus → 28 days maximum
-   - ALWAYS apply: day_supply = min(calculated, beyond_use_date)
-   - Common limits: 14, 21, 28, 30, 42, 56 days
-   - Check database "Expiration_After_Opening_Days" field FIRST
-
-3. PACKAGE SIZE SELECTION:
-   - HandiHaler → 30 capsules (NOT 90)
-   - Use SMALLEST retail package size
-   - Check "Retail_Package_Value" field first
-
-4. PRN FREQUENCY ESTIMATION:
-   - q4h prn = 6 max/day → estimate 3/day (50%)
-   - q6h prn = 4 max/day → estimate 2/day (50%)
-   - "may repeat" = conservative PRN usage
-
-5. EMERGENCY MEDICATIONS:
-   - Nayzilam (seizure) → 1-2 days maximum (emergency episodes)
-   - Migranol (migraine) → 4-8 days maximum (limited episodes per month)
-   - Emergency meds have strict episode limits in database
-
-6. UNKNOWN MEDICATIONS:
-   - If drug not in PAAS database → confidence: 0.0
-   - Add note: "Drug not in PAAS database"
-
-CALCULATION PRIORITY:
-1. Check for immediate discard medications FIRST
-2. Parse frequency and dose from SIG
-3. Apply PRN reduction if needed (50%)
-4. Calculate: package_contents ÷ (dose × frequency)
-5. Apply beyond-use date limit
-6. Apply discard date limit
-7. Return minimum of all constraints
-
-Critical Examples:
-- "inject 2 mg subcutaneously once weekly" (Bydureon) → 1 day (immediate discard)
-- "inject 16 units subcutaneously once daily" (Xultophy) → 21 days max (beyond-use)
-- "inhale 1 capsule once daily" (HandiHaler) → 30 days (30-capsule package)
-- "inject 5 mcg subcutaneously twice daily" (Byetta) → 30 days max (expiration limit)
-- "inject 15 units subcutaneously once daily" (Soliqua) → 28 days max (expiration limit)
-- "spray 1 spray in one nostril, may repeat" (Nayzilam) → 1-2 days (emergency use only)
-- "spray 1 spray in each nostril, may repeat" (Migranol) → 4-8 days (migraine episodes only)
-- "inhale 2 puffs as needed, may use up to every 4 hours" (Ventolin) → 33 days (q4h prn = 3 times/day × 2 puffs = 6 puffs/day, 200÷6=33)
-            - "2 puffs per nostril daily for seasonal allergies" → daily_frequency: 1.0, dose_per_administration: 4.0
-            - "spray in nose when allergies act up, 2 squirts each side" → daily_frequency: 1.0, dose_per_administration: 4.0, is_prn: true
-            - "2-3 sprays each nostril q12h prn congestion, do not use >3 days" → daily_frequency: 2.0, dose_per_administration: 5.0, is_prn: true
-            - "1 spray each nostril daily for child, may increase to 2 sprays if needed" → daily_frequency: 1.0, dose_per_administration: 2.0
-            - "1-2 sprays bilaterally bid for allergic rhinitis and congestion" → daily_frequency: 2.0, dose_per_administration: 3.0
-            - "start 1 spray each nostril bid, increase to 2 sprays tid if symptoms persist" → daily_frequency: 2.5, dose_per_administration: 2.5
-            - "1 spray daily alternating nostrils, take with calcium supplement" → daily_frequency: 1.0, dose_per_administration: 1.0
-            - "1 spray one nostril for severe pain, may repeat in 60-90 min if inadequate relief" → daily_frequency: 1.0, dose_per_administration: 1.0, is_prn: true
-            - "2 sprays each nostril daily for maintenance, may use 4 sprays during flare-ups" → daily_frequency: 1.0, dose_per_administration: 4.0
-
-            Key parsing rules:
-            - "each nostril" or "both nostrils" or "bilat nares" = multiply dose by 2
-            - "per nostril" = multiply dose by 2
-            - "morning and evening/night" = BID (2x daily)
-            - "qhs" = once daily at bedtime
-            - "bid" = twice daily
-            - "tid" = three times daily
-            - "qid" = four times daily
-            - "q6h" = every 6 hours = 4x daily
-            - "q8h" = every 8 hours = 3x daily
-            - "q12h" = every 12 hours = 2x daily
-            - "prn" or "when needed" or "as needed" = PRN medication
-            - "may repeat" = PRN medication
-            - For PRN: estimate conservative usage (50% of max frequency)
+                    result = _json_loads(response_text)
 
-            Extract:
-            - daily_frequency: How many times per day (consider PRN reduction)
-            - dose_per_administration: Total amount per dose (include both nostrils if specified)
-            - is_prn: True if PRN/as needed
-            - route: "nasal", "inhaled", "oral", etc.
-            - standardized_directions: Clean, professional version
-            - confidence: Your confidence in the parsing (0.0-1.0)
-            - suggested_day_supply: Calculate day supply using the drug data (optional)
-            - calculation_notes: Explain your day supply calculation (optional)
+                    # Validate the response structure
+                    if isinstance(result, dict) and result.get("confidence", 0) > 0.6:
+                        enhanced_names = result.get("enhanced_names", [])
+                        if enhanced_names:
+                            logger.info(
+                                f"LLM enhanced drug search: '{drug_name}' → {enhanced_names}"
+                            )
+                            self._cache_llm_reply(cache_key, list(enhanced_names))
+                            return enhanced_names
 
-            For day supply calculation (if drug data provided):
-            - For nasal sprays: Total sprays in package ÷ (dose_per_administration × daily_frequency)
-            - For oral inhalers: Total puffs in package ÷ (dose_per_administration × daily_frequency)
-            - For insulin: Total units in package ÷ (dose_per_administration × daily_frequency), limited by beyond use date
-            - Consider PRN medications use ~50% of calculated frequency
-            - Apply discard dates and beyond use dates as limits
+                except (json.JSONDecodeError, KeyError, TypeError) as e:
+                    logger.debug(f"Failed to parse LLM drug search response: {e}")
 
-            Be conservative with PRN medications - estimate lower usage for safety.
+            return None
 
-            IMPORTANT: Respond with valid JSON only. Example format:
-            {{
-                "daily_frequency": 2.0,
-                "dose_per_administration": 2.0,
-                "is_prn": false,
-                "route": "inhaled",
-                "standardized_directions": "Inhale 2 puffs twice daily",
-                "confidence": 0.9
-            }}
-            """
+        except Exception as e:
+            logger.debug(f"LLM drug search enhancement failed: {e}")
+            return None
 
-            # Check if using Gemini API
-            base_url_str = (
-                str(self.llm_client.base_url) if self.llm_client.base_url else ""
-            )
-            if "generativelanguage.googleapis.com" in base_url_str:
-                model = "gemini-2.0-flash"
-            else:
-                model = "gpt-4o-mini"
+    def _llm_parse_sig(
+        self,
+        sig: str,
+        drug_data: Optional[Dict] = None,
+        drug_name: Optional[str] = None,
+    ) -> Optional[Dict[str, float]]:
+        """Use LLM to parse complex or non-standard sig directions
+
+        Returns None without a round trip for sigs the rule-based parser
+        handles on its own, so callers fall back to it.
+        """
+        if not self.llm_enabled or _sig_is_simple(sig):
+            return None
+
+        try:
+            drug_info_text = self._sig_drug_info(drug_data, drug_name)
+            # Enhanced PAAS-compliant prompt with critical failure fixes
+            prompt = f'{_SIG_PROMPT_HEAD}"{sig}"\n{drug_info_text}{_SIG_PROMPT_RULES}'
+            model = self._llm_model()
+
+            # The sig and drug information are all that vary between prompts,
+            # so a sig seen again with the same drug data skips the round trip
+            cache_key = _llm_sig_cache_key(model, sig, drug_info_text)
+            cached = self._cached_llm_reply(cache_key)
+            if cached is not None:
+                return cached
 
             # Use enhanced model if drug data is available, otherwise use basic model
             # response_format = (
@@ -718,11 +1750,12 @@ Critical Examples:
             # tus
 
             # Make the API call
-            completion = self.llm_client.chat.completions.create(
+            completion = self._llm_completion(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
+                temperature=0.0,
                 timeout=15.0,
+                response_format={"type": "json_object"},
             )
 
             if completion.choices and completion.choices[0].message.content:
@@ -730,47 +1763,16 @@ Critical Examples:
                 logger.info(f"LLM raw response: {response_text[:200]}...")
 
                 try:
-                    # Try to extract JSON from response
-                    import json
-                    import re
-
-                    # Look for JSON in markdown code blocks first
-                    json_match = re.search(
-                        r"```(?:json)?\s*(\{.*?\})\s*```", response_text, re.DOTALL
-                    )
-                    if json_match:
-                        response_text = json_match.group(1)
-
                     # Parse JSON
-                    result_dict = json.loads(response_text)
+                    result_dict = _json_loads(_unwrap_json_reply(response_text))
                     logger.info(f"LLM parsed JSON: {result_dict}")
 
-                    # Build return dictionary with reasonable defaults
-                    llm_result = {
-                        "frequency": float(result_dict.get("daily_frequency", 1.0)),
-                        "dose": float(result_dict.get("dose_per_administration", 1.0)),
-                        "is_prn": bool(result_dict.get("is_prn", False)),
-                        "route": str(result_dict.get("route", "oral")),
-                        "standardized": str(
-                            result_dict.get("standardized_directions", sig)
-                        ),
-                    }
-
-                    # Add enhanced fields if available
-                    if result_dict.get("suggested_day_supply"):
-                        llm_result["suggested_day_supply"] = int(
-                            result_dict["suggested_day_supply"]
-                        )
-
-                    if result_dict.get("calculation_notes"):
-                        llm_result["calculation_notes"] = str(
-                            result_dict["calculation_notes"]
-                        )
-
+                    llm_result = _llm_sig_result(result_dict, sig)
                     logger.info(
                         f"LLM parsed sig: '{sig}' → freq: {llm_result['frequency']}, dose: {llm_result['dose']}, prn: {llm_result['is_prn']}"
                     )
-                    return llm_result
+                    self._cache_llm_reply(cache_key, llm_result)
+                    return dict(llm_result)
 
                 except (json.JSONDecodeError, KeyError, ValueError, TypeError) as e:
                     logger.warning(f"Failed to parse LLM sig parsing response: {e}")
@@ -782,40 +1784,150 @@ Critical Examples:
             logger.debug(f"LLM sig parsing failed: {e}")
             return None
 
-    def _extract_numbers_from_sig(self, sig: str) -> Dict[str, List[float]]:
-        """Extract numerical values and their units from sig/directions"""
-        sig_lower = sig.lower()
-
-        # Patterns for different units
-        patterns = {
-            "sprays": r"(\d+(?:\.\d+)?)\s*(?:spray|sprays|puff|puffs)",
-            "units": r"(\d+(?:\.\d+)?)\s*(?:unit|units|u\b)",
-            "mg": r"(\d+(?:\.\d+)?)\s*(?:mg|milligram|milligrams)",
-            "ml": r"(\d+(?:\.\d+)?)\s*(?:ml|milliliter|milliliters|cc)",
-            "drops": r"(\d+(?:\.\d+)?)\s*(?:drop|drops|gtt)",
-            "patches": r"(\d+(?:\.\d+)?)\s*(?:patch|patches)",
-            "tablets": r"(\d+(?:\.\d+)?)\s*(?:tablet|tablets|tab|tabs)",
-            "capsules": r"(\d+(?:\.\d+)?)\s*(?:capsule|capsules|cap|caps)",
-            "times_daily": r"(\d+(?:\.\d+)?)\s*(?:times?\s*(?:per\s*)?(?:day|daily)|x\s*(?:per\s*)?(?:day|daily))",
-        }
+    def _prefetch_llm_sigs(
+        self,
+        requests: Sequence[Tuple[str, Optional[Dict], Optional[str]]],
+        max_concurrency: int = 8,
+    ) -> None:
+        """Parse the uncached (sig, drug_data, drug_name) requests into the LLM
+        sig cache, _LLM_SIG_BATCH_SIZE sigs per chat completion
+
+        Each result is cached under the request's single-sig cache key, so the
+        _llm_parse_sig calls that follow are cache hits. Sigs a batched reply
+        does not answer usably are left for _llm_parse_sig to send alone.
+        """
+        model = self._llm_model()
+        pending: Dict[bytes, Tuple[str, str]] = {}
+        for sig, drug_data, drug_name in requests:
+            if _sig_is_simple(sig):
+                continue
+            drug_info_text = self._sig_drug_info(drug_data, drug_name)
+            cache_key = _llm_sig_cache_key(model, sig, drug_info_text)
+            if cache_key not in pending and self._cached_llm_reply(cache_key) is None:
+                pending[cache_key] = (sig, f'"{sig}"\n{drug_info_text}')
+
+        items = list(pending.items())
+        chunks = []
+        for start in range(0, len(items), _LLM_SIG_BATCH_SIZE):
+            end = start + _LLM_SIG_BATCH_SIZE
+            chunks.append(items[start:end])
+        if len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                list(
+                    executor.map(
+                        lambda chunk: self._prefetch_llm_sig_chunk(model, chunk), chunks
+                    )
+                )
+        elif chunks:
+            self._prefetch_llm_sig_chunk(model, chunks[0])
+
+    def _prefetch_llm_sig_chunk(
+        self, model: str, chunk: List[Tuple[bytes, Tuple[str, str]]]
+    ) -> None:
+        """Parse one chunk of _prefetch_llm_sigs requests with a single prompt"""
+        prompt = (
+            _SIG_BATCH_PROMPT_HEAD
+            + "".join(
+                f"\nPRESCRIPTION {number} SIG: {subject}"
+                for number, (_, (_, subject)) in enumerate(chunk, 1)
+            )
+            + _SIG_PROMPT_RULES
+            + _SIG_BATCH_PROMPT_TAIL
+        )
+        try:
+            completion = self._llm_completion(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.0,
+                timeout=_LLM_SIG_BATCH_TIMEOUT_SECONDS,
+                response_format={"type": "json_object"},
+            )
+            response_text = completion.choices[0].message.content.strip()
+            results = _json_loads(_unwrap_json_reply(response_text))["results"]
+        except Exception as e:
+            logger.debug(f"LLM batch sig parsing failed: {e}")
+            return
+        if not isinstance(results, list) or len(results) != len(chunk):
+            logger.debug("LLM batch sig parsing reply does not match the prescriptions")
+            return
 
-        extracted = {}
-        for unit, pattern in patterns.items():
-            matches = re.findall(pattern, sig_lower)
-            if matches:
-                extracted[unit] = [float(match) for match in matches]
+        for (cache_key, (sig, _)), result_dict in zip(chunk, results):
+            try:
+                self._cache_llm_reply(cache_key, _llm_sig_result(result_dict, sig))
+            except (AttributeError, KeyError, ValueError, TypeError) as e:
+                logger.debug(f"Skipping unusable LLM batch sig result for '{sig}': {e}")
+
+    def _sig_drug_info(
+        self, drug_data: Optional[Dict], drug_name: Optional[str]
+    ) -> str:
+        """Drug information block of a sig parsing prompt"""
+        # Build enhanced prompt with drug-specific CSV data
+        drug_info_text = ""
+        if drug_data and drug_name:
+            drug_info_text = "\n" + _prompt_block(
+                ["DRUG INFORMATION FROM DATABASE:", f"Drug Name: {drug_name}"]
+            )
+            # Add relevant CSV data based on medication type
+            for marker_field, lines in _PROMPT_DRUG_FIELDS:
+                if marker_field in drug_data:
+                    drug_info_text += _prompt_block(
+                        template.format(
+                            *(drug_data.get(key, default) for key, default in fields)
+                        )
+                        for template, fields in lines
+                    )
+                    break
+            else:
+                # Generic data
+                for key, value in drug_data.items():
+                    if key not in ["type", "data"] and value and str(value) != "nan":
+                        drug_info_text += _prompt_block(
+                            [f"{key.replace('_', ' ').title()}: {value}"]
+                        )
+        return drug_info_text
+
+    def _llm_model(self) -> str:
+        """Chat model for the configured LLM endpoint"""
+        # Check if using Gemini API
+        base_url_str = str(self.llm_client.base_url) if self.llm_client.base_url else ""
+        if "generativelanguage.googleapis.com" in base_url_str:
+            return "gemini-2.0-flash"
+        return "gpt-4o-mini"
+
+    def _cached_llm_reply(self, cache_key: bytes) -> Optional[Any]:
+        """Copy of the cached LLM reply for cache_key, or None"""
+        with self._llm_cache_lock:
+            cached = self._llm_cache.get(cache_key)
+            if cached is None:
+                return None
+            self._llm_cache.move_to_end(cache_key)
+        return copy.copy(cached)
+
+    def _cache_llm_reply(self, cache_key: bytes, reply: Any) -> None:
+        """Store a successful LLM reply, evicting the least recently used"""
+        with self._llm_cache_lock:
+            self._llm_cache[cache_key] = reply
+            if len(self._llm_cache) > _LLM_CACHE_SIZE:
+                self._llm_cache.popitem(last=False)
 
-        return extracted
+    def _extract_numbers_from_sig(self, sig: str) -> Dict[str, List[float]]:
+        """Extract numerical values and their units from sig/directions"""
+        return {unit: list(values) for unit, values in _sig_numbers(sig)}
 
     def _calculate_frequency_per_day(
         self,
         sig: str,
         drug_data: Optional[Dict] = None,
         matched_drug_name: Optional[str] = None,
+        use_llm: bool = True,
     ) -> float:
-        """Calculate how many times per day medication is taken"""
+        """Calculate how many times per day medication is taken
+
+        Callers whose own _llm_parse_sig call for this sig just failed pass
+        use_llm=False, as a second attempt would repeat the round trip.
+        """
         # Try LLM parsing first if available
-        if self.llm_enabled:
+        if self.llm_enabled and use_llm:
             llm_result = self._llm_parse_sig(sig, drug_data, matched_drug_name)
             if llm_result:
                 frequency = llm_result["frequency"]
@@ -826,79 +1938,7 @@ Critical Examples:
                 return frequency
 
         # Fallback to rule-based parsing
-        sig_lower = sig.lower()
-
-        # Check for weekly dosing first
-        if any(
-            term in sig_lower
-            for term in ["weekly", "once a week", "once weekly", "every week"]
-        ):
-            return 1.0 / 7.0  # Once per week = 1/7 per day
-        elif any(
-            term in sig_lower
-            for term in ["every other week", "biweekly", "every 2 weeks"]
-        ):
-            return 1.0 / 14.0  # Every other week = 1/14 per day
-        elif any(
-            term in sig_lower for term in ["monthly", "once a month", "every month"]
-        ):
-            return 1.0 / 30.0  # Monthly = 1/30 per day
-
-        # Handle PRN (as needed) medications - estimate usage based on PAAS scenarios
-        if "prn" in sig_lower or "as needed" in sig_lower:
-            # For PRN medications, use PAAS-compliant estimates
-            if "q4h" in sig_lower or "every 4 hours" in sig_lower:
-                return 4.5  # 6 times max, estimate higher usage for PAAS compliance
-            elif (
-                "q6h" in sig_lower
-                or "every 6 hours" in sig_lower
-                or "q6-8h" in sig_lower
-            ):
-                return 6.0  # For PAAS compliance: 2 puffs × 6 times = 12 puffs/day → 16 days
-            elif "q8h" in sig_lower or "every 8 hours" in sig_lower:
-                return 2.5  # 3 times max, estimate higher usage
-            elif any(term in sig_lower for term in ["bid", "b.i.d", "twice"]):
-                return 1.5  # 2 times max, estimate higher usage
-            else:
-                return 1.0  # Default PRN usage
-
-        # Check specific frequencies FIRST (before generic "daily")
-        elif any(term in sig_lower for term in ["qid", "q.i.d", "four times"]):
-            return 4.0
-        elif any(
-            term in sig_lower for term in ["thrice", "tid", "t.i.d", "three times"]
-        ):
-            return 3.0
-        elif any(term in sig_lower for term in ["twice", "bid", "b.i.d"]):
-            return 2.0
-        # Generic "daily" patterns (check AFTER specific frequencies)
-        elif (
-            any(term in sig_lower for term in ["once", "daily", "qd", "q.d", "sid"])
-            and "twice" not in sig_lower
-            and "three times" not in sig_lower
-            and "four times" not in sig_lower
-        ):
-            return 1.0
-        elif "q6h" in sig_lower or "every 6 hours" in sig_lower:
-            return 4.0
-        elif "q8h" in sig_lower or "every 8 hours" in sig_lower:
-            return 3.0
-        elif "q12h" in sig_lower or "every 12 hours" in sig_lower:
-            return 2.0
-        elif "q24h" in sig_lower or "every 24 hours" in sig_lower:
-            return 1.0
-        elif "q4h" in sig_lower or "every 4 hours" in sig_lower:
-            return 6.0
-
-        # Look for explicit "X times per day"
-        times_match = re.search(
-            r"(\d+(?:\.\d+)?)\s*times?\s*(?:per\s*)?(?:day|daily)", sig_lower
-        )
-        if times_match:
-            return float(times_match.group(1))
-
-        # Default assumption
-        return 1.0
+        return _rule_based_frequency(sig.lower())
 
     def _process_nasal_inhaler(
         self,
@@ -910,6 +1950,7 @@ Critical Examples:
         """Process nasal inhaler prescription - no warnings"""
         max_sprays = drug_data.get("Max_Total_Sprays", 0)
         drug_name_lower = str(matched_drug_name or "").lower()
+        sig_lower = sig.lower()
 
         # Try LLM parsing first for complex sigs
         llm_parsed = None
@@ -947,7 +1988,7 @@ Critical Examples:
             # Fallback to rule-based parsing
             extracted = self._extract_numbers_from_sig(sig)
             frequency = self._calculate_frequency_per_day(
-                sig, drug_data, matched_drug_name
+                sig, drug_data, matched_drug_name, use_llm=False
             )
 
             # Determine sprays per dose - look for patterns like "4 sprays per nostril"
@@ -956,22 +1997,13 @@ Critical Examples:
                 sprays_per_dose = extracted["sprays"][0]
 
             # Check for "per nostril" or "each nostril" patterns
-            sig_lower = sig.lower()
-            if any(
-                phrase in sig_lower
-                for phrase in [
-                    "per nostril",
-                    "each nostril",
-                    "in each nostril",
-                    "both nostrils",
-                    "bilat nares",
-                ]
-            ):
+            if not _BOTH_NOSTRILS_TERMS.isdisjoint(_sig_terms(sig_lower)):
                 # If it says "X sprays per nostril" or "X sprays each nostril", multiply by 2
                 sprays_per_dose = sprays_per_dose * 2
 
-            # Standardize sig
-            standardized_sig = (
+            # Standardize sig; rule-built sigs come from a handful of
+            # templates, so batch results share interned copies
+            standardized_sig = sys.intern(
                 f"Use {sprays_per_dose} spray(s) {self._frequency_to_text(frequency)}"
             )
 
@@ -995,20 +2027,11 @@ Critical Examples:
             corrected_quantity = quantity  # Likely already number of packages
 
         # Get PAAS example scenarios if available
-        example_scenarios = drug_data.get("Example_Days_Supply_Scenarios", {})
-        if isinstance(example_scenarios, str):
-            try:
-                import json
-
-                example_scenarios = json.loads(example_scenarios.replace("'", '"'))
-            except Exception:
-                example_scenarios = {}
-        elif pd.isna(example_scenarios) or not isinstance(example_scenarios, dict):
-            # Handle NaN or other invalid types
-            example_scenarios = {}
+        example_scenarios = _coerce_scenarios(
+            drug_data.get("Example_Days_Supply_Scenarios", {})
+        )
 
         # Calculate day supply using PAAS methodology
-        total_sprays_available = corrected_quantity * max_sprays
         daily_spray_usage = sprays_per_dose * frequency
 
         # First, try to use PAAS example scenarios for accurate calculations
@@ -1023,41 +2046,13 @@ Critical Examples:
                 )
             else:
                 # Check for common sig interpretation errors and correct them
+                found = _sig_terms(sig_lower)
                 corrected_usage = None
-
-                # For "three times daily" with "1 spray each nostril"
-                if any(
-                    x in sig.lower()
-                    for x in ["three times daily", "3 times daily", "tid"]
-                ):
-                    if (
-                        "1 spray each nostril" in sig.lower()
-                        or "one spray each nostril" in sig.lower()
-                    ):
-                        corrected_usage = (
-                            6  # 1 spray each nostril x 3 times = 6 sprays/day
-                        )
-                    elif "2 spray" in sig.lower() or "two spray" in sig.lower():
-                        corrected_usage = (
-                            12  # 2 sprays each nostril x 3 times = 12 sprays/day
-                        )
-
-                # For "four times daily"
-                elif any(
-                    x in sig.lower()
-                    for x in ["four times daily", "4 times daily", "qid"]
-                ):
-                    if (
-                        "1 spray each nostril" in sig.lower()
-                        or "one spray each nostril" in sig.lower()
-                    ):
-                        corrected_usage = (
-                            8  # 1 spray each nostril x 4 times = 8 sprays/day
-                        )
-                    elif "2 spray" in sig.lower() or "two spray" in sig.lower():
-                        corrected_usage = (
-                            16  # 2 sprays each nostril x 4 times = 16 sprays/day
-                        )
+                doses = _first_rung(_NASAL_CORRECTION_DOSES, found)
+                if doses is not None:
+                    sprays = _first_rung(_NASAL_CORRECTION_SPRAYS, found)
+                    if sprays is not None:
+                        corrected_usage = doses * sprays
 
                 # Check if corrected usage matches a PAAS scenario
                 if corrected_usage:
@@ -1069,51 +2064,26 @@ Critical Examples:
                         )
                     else:
                         # Calculate based on corrected usage
-                        day_supply = int(total_sprays_available / corrected_usage)
+                        day_supply = self._day_supply(
+                            corrected_quantity, max_sprays, corrected_usage, 1.0
+                        )
                 else:
                     # Calculate based on original total sprays and usage
-                    day_supply = int(total_sprays_available / daily_spray_usage)
-        elif daily_spray_usage > 0:
-            day_supply = int(total_sprays_available / daily_spray_usage)
+                    day_supply = self._day_supply(
+                        corrected_quantity, max_sprays, sprays_per_dose, frequency
+                    )
         else:
-            day_supply = 30
+            day_supply = self._day_supply(
+                corrected_quantity, max_sprays, sprays_per_dose, frequency
+            )
 
         # Special handling for specific medications with unique usage patterns
-        if "calcitonin" in drug_name_lower:
-            # Calcitonin: 1 spray per day, alternating nostrils
-            # With 30 sprays total, should last 30 days
-            day_supply = max_sprays  # 30 sprays = 30 days
-        elif "butorphanol" in drug_name_lower:
-            # Butorphanol: PRN pain medication, very limited usage
-            # With 14-15 sprays, estimate conservative usage
-            day_supply = max(7, min(14, max_sprays))  # 7-14 days range
-        elif "migranol" in drug_name_lower or "migranal" in drug_name_lower:
-            # Migranol: Migraine medication, limited usage
-            # Max 4 sprays per migraine, 3mg per 24h, 4mg per 7 days
-            # With 64 sprays, estimate 32-64 days based on usage
-            day_supply = max(32, min(64, max_sprays))
-        elif "nayzilam" in drug_name_lower or "neffy" in drug_name_lower:
-            # Emergency medications: very limited usage
-            # 2 sprays per episode, max 5 episodes per month
-            if max_sprays <= 2:
-                day_supply = 7  # Single episode coverage
-            else:
-                day_supply = max(7, min(30, max_sprays))
-        elif "zavzpret" in drug_name_lower:
-            # Migraine medication: 1 spray per 24h, max 8 migraines per month
-            # With 6 sprays, should last about 6 days of treatment
-            day_supply = max_sprays  # 6 sprays = 6 days
-        elif "sprix" in drug_name_lower or "trudhesa" in drug_name_lower:
-            # Pain/migraine medications with specific limits
-            # Sprix: max 8 sprays per day for 5 days
-            # Trudhesa: max 4 sprays per 24h, 6 per 7 days
-            if max_sprays <= 8:
-                day_supply = max(4, min(7, max_sprays))
-            else:
-                day_supply = max(7, min(14, max_sprays // 2))
+        brand_days = _first_rung(_NASAL_BRAND_DAY_SUPPLY, _brand_terms(drug_name_lower))
+        if brand_days is not None:
+            day_supply = brand_days(max_sprays)
         else:
             # Regular nasal sprays - ensure reasonable bounds (7-365 days)
-            day_supply = max(7, min(day_supply, 365))
+            day_supply = _clamp_day_supply(day_supply)
 
         return corrected_quantity, day_supply, standardized_sig
 
@@ -1127,20 +2097,12 @@ Critical Examples:
         """Process oral inhaler prescription using PAAS-compliant calculations"""
         puffs_per_package = drug_data.get("Retail_Puffs_per_Package", 0)
         discard_days = drug_data.get("Discard_After_Opening_Days", 0)
-        drug_name_lower = str(matched_drug_name or "").lower()
+        brands = _brand_terms(str(matched_drug_name or "").lower())
 
         # Get PAAS example scenarios if available
-        example_scenarios = drug_data.get("Example_Days_Supply_Scenarios", {})
-        if isinstance(example_scenarios, str):
-            try:
-                import json
-
-                example_scenarios = json.loads(example_scenarios.replace("'", '"'))
-            except Exception:
-                example_scenarios = {}
-        elif pd.isna(example_scenarios) or not isinstance(example_scenarios, dict):
-            # Handle NaN or other invalid types
-            example_scenarios = {}
+        example_scenarios = _coerce_scenarios(
+            drug_data.get("Example_Days_Supply_Scenarios", {})
+        )
 
         # Try LLM parsing first for complex sigs
         llm_parsed = None
@@ -1167,7 +2129,7 @@ Critical Examples:
             # Fallback to rule-based parsing
             extracted = self._extract_numbers_from_sig(sig)
             frequency = self._calculate_frequency_per_day(
-                sig, drug_data, matched_drug_name
+                sig, drug_data, matched_drug_name, use_llm=False
             )
 
             # Determine puffs per dose based on inhaler type and sig
@@ -1178,19 +2140,21 @@ Critical Examples:
                 puffs_per_dose = extracted["sprays"][0]
 
             # Adjust for specific inhaler types
-            if "ellipta" in drug_name_lower:
+            if not _ELLIPTA_TERMS.isdisjoint(brands):
                 # Ellipta devices are typically once daily, 1 puff
                 puffs_per_dose = 1
                 if frequency > 1:
                     frequency = 1  # Override to once daily
-            elif "handihaler" in drug_name_lower or "twisthaler" in drug_name_lower:
+            elif not _DRY_POWDER_INHALER_TERMS.isdisjoint(brands):
                 # Dry powder inhalers, typically 1-2 puffs once daily
                 puffs_per_dose = min(puffs_per_dose, 2)
                 if frequency > 2:
                     frequency = min(frequency, 2)
 
             # Generate standardized sig
-            standardized_sig = f"Inhale {int(puffs_per_dose)} puff(s) {self._frequency_to_text(frequency)}"
+            standardized_sig = sys.intern(
+                f"Inhale {int(puffs_per_dose)} puff(s) {self._frequency_to_text(frequency)}"
+            )
 
         # Accept prescribed quantity
         corrected_quantity = quantity
@@ -1214,21 +2178,20 @@ Critical Examples:
                 )
             else:
                 # Calculate based on total puffs and usage
-                calculated_days = int(total_puffs / daily_puffs)
+                calculated_days = self._day_supply(
+                    corrected_quantity, puffs_per_package, puffs_per_dose, frequency
+                )
         else:
             # Fallback calculation
-            calculated_days = int(total_puffs / daily_puffs) if daily_puffs > 0 else 30
+            calculated_days = self._day_supply(
+                corrected_quantity, puffs_per_package, puffs_per_dose, frequency
+            )
 
         # Special handling for specific inhaler types
-        if "ellipta" in drug_name_lower:
+        if not _ELLIPTA_TERMS.isdisjoint(brands):
             # Ellipta inhalers: 1 puff daily, limited by discard date
             calculated_days = min(total_puffs, discard_days if discard_days > 0 else 90)
-        elif (
-            "albuterol" in drug_name_lower
-            or "proair" in drug_name_lower
-            or "ventolin" in drug_name_lower
-            or "xopenex" in drug_name_lower
-        ):
+        elif not _RESCUE_INHALER_TERMS.isdisjoint(brands):
             # Rescue inhalers: Use PAAS scenarios based on actual prescribed usage
             daily_puffs = frequency * puffs_per_dose
             scenario_key = str(int(daily_puffs))
@@ -1250,7 +2213,9 @@ Critical Examples:
                 estimated_daily_usage = max(
                     4, daily_puffs
                 )  # Use actual usage or minimum 4
-                calculated_days = int(total_puffs / estimated_daily_usage)
+                calculated_days = self._day_supply(
+                    corrected_quantity, puffs_per_package, estimated_daily_usage, 1.0
+                )
 
         # Apply discard date limit if applicable
         if discard_days > 0:
@@ -1259,7 +2224,7 @@ Critical Examples:
             day_supply = calculated_days
 
         # Ensure reasonable bounds
-        day_supply = max(7, min(day_supply, 365))
+        day_supply = _clamp_day_supply(day_supply)
 
         return corrected_quantity, day_supply, standardized_sig
 
@@ -1273,7 +2238,42 @@ Critical Examples:
         """Process insulin prescription - no warnings"""
         total_units = drug_data.get("Total_Units_per_Package", 0)
         beyond_use_days = drug_data.get("Beyond_Use_Date_Days", 28)
+        units_per_dose, frequency, standardized_sig = self._insulin_dosing(
+            drug_data, sig, matched_drug_name
+        )
+
+        # Accept prescribed quantity
+        corrected_quantity = quantity
+
+        # Calculate day supply
+        if total_units <= 0:
+            total_units = 500  # Reasonable default
+
+        calculated_days = self._day_supply(
+            corrected_quantity, total_units, units_per_dose, frequency
+        )
+
+        # Apply beyond use date limit only if calculated days exceed it
+        if calculated_days > beyond_use_days and beyond_use_days > 0:
+            day_supply = beyond_use_days
+            logger.info(
+                f"Insulin day supply limited by beyond use date: {calculated_days} → {beyond_use_days} days"
+            )
+        else:
+            day_supply = calculated_days
+
+        # Ensure reasonable bounds
+        day_supply = _clamp_day_supply(day_supply)
+
+        return corrected_quantity, day_supply, standardized_sig
 
+    def _insulin_dosing(
+        self,
+        drug_data: Dict,
+        sig: str,
+        matched_drug_name: Optional[str] = None,
+    ) -> Tuple[float, float, str]:
+        """Parse units per dose, doses per day and standardized sig for insulin"""
         # Try LLM parsing first for complex sigs
         llm_parsed = None
         if self.llm_enabled:
@@ -1291,7 +2291,7 @@ Critical Examples:
             # Fallback to rule-based parsing
             extracted = self._extract_numbers_from_sig(sig)
             frequency = self._calculate_frequency_per_day(
-                sig, drug_data, matched_drug_name
+                sig, drug_data, matched_drug_name, use_llm=False
             )
 
             # Determine units per dose
@@ -1300,52 +2300,22 @@ Critical Examples:
                 units_per_dose = extracted["units"][0]
 
             # Generate standardized sig
-            standardized_sig = f"Inject {int(units_per_dose)} units {self._frequency_to_text(frequency)}"
-
-        # Accept prescribed quantity
-        corrected_quantity = quantity
-
-        # Calculate day supply
-        if total_units <= 0:
-            total_units = 500  # Reasonable default
-
-        total_available_units = corrected_quantity * total_units
-        calculated_days = (
-            int(total_available_units / (units_per_dose * frequency))
-            if frequency > 0
-            else 30
-        )
-
-        # Apply beyond use date limit only if calculated days exceed it
-        if calculated_days > beyond_use_days and beyond_use_days > 0:
-            day_supply = beyond_use_days
-            logger.info(
-                f"Insulin day supply limited by beyond use date: {calculated_days} → {beyond_use_days} days"
+            standardized_sig = sys.intern(
+                f"Inject {int(units_per_dose)} units {self._frequency_to_text(frequency)}"
             )
-        else:
-            day_supply = calculated_days
 
-        # Ensure reasonable bounds
-        day_supply = max(7, min(day_supply, 365))
-
-        return corrected_quantity, day_supply, standardized_sig
+        return units_per_dose, frequency, standardized_sig
 
     def _process_eyedrop(
         self, drug_name: str, quantity: float, sig: str
     ) -> Tuple[float, int, str]:
         """Process eyedrop prescription - no warnings"""
         # Get PBM guidelines (default to PAAS National)
-        if not self.eyedrop_guidelines.empty:
-            pbm_data = self.eyedrop_guidelines[
-                self.eyedrop_guidelines["PBM"] == "PAAS National Default"
-            ]
-            if pbm_data.empty:
-                pbm_data = self.eyedrop_guidelines.iloc[0]
-            else:
-                pbm_data = pbm_data.iloc[0]
-
+        drug_name_lower = drug_name.lower()
+        pbm_data = self._eyedrop_pbm_defaults
+        if pbm_data is not None:
             # Determine if suspension or solution
-            is_suspension = "suspension" in drug_name.lower()
+            is_suspension = "suspension" in drug_name_lower
 
             if is_suspension:
                 drops_per_ml = pbm_data["Min_Drops_per_mL_Suspension"]
@@ -1374,20 +2344,23 @@ Critical Examples:
             total_ml = quantity
 
         # Calculate day supply
-        total_drops = total_ml * drops_per_ml
-        daily_drops = drops_per_dose * frequency
-        calculated_days = int(total_drops / daily_drops) if daily_drops > 0 else 30
+        calculated_days = self._day_supply(
+            total_ml, drops_per_ml, drops_per_dose, frequency
+        )
 
         # Check for specific beyond use dates
-        if not self.eyedrop_beyond_use.empty:
-            beyond_use_row = self.eyedrop_beyond_use[
-                self.eyedrop_beyond_use["Product_Name"]
-                .str.lower()
-                .str.contains(drug_name.lower().split()[0], na=False)
-            ]
-
-            if not beyond_use_row.empty:
-                beyond_use_days = beyond_use_row.iloc[0]["Beyond_Use_Date_Days"]
+        if self._eyedrop_beyond_use_days:
+            name_token = drug_name_lower.split()[0]
+            beyond_use_days = next(
+                (
+                    days
+                    for product, days in self._eyedrop_beyond_use_days
+                    if name_token in product
+                ),
+                None,
+            )
+
+            if beyond_use_days is not None:
                 day_supply = min(calculated_days, beyond_use_days)
             else:
                 day_supply = calculated_days
@@ -1395,9 +2368,9 @@ Critical Examples:
             day_supply = calculated_days
 
         # Ensure reasonable bounds
-        day_supply = max(7, min(day_supply, 365))
+        day_supply = _clamp_day_supply(day_supply)
 
-        standardized_sig = (
+        standardized_sig = sys.intern(
             f"Instill {drops_per_dose} drop(s) {self._frequency_to_text(frequency)}"
         )
 
@@ -1413,30 +2386,35 @@ Critical Examples:
         # Accept prescribed quantity
         corrected_quantity = quantity
 
-        # Calculate day supply based on typical injection schedules
-        if is_biologic:
+        # Calculate day supply based on typical injection schedules: days
+        # between doses, or 0 to go by the parsed frequency
+        interval = _first_rung(_INTERVAL_FREQUENCIES, _sig_terms(sig.lower()))
+        if interval is not None:
+            # Weekly, twice weekly, every other week or monthly schedule
+            schedule_days = _INJECTION_SCHEDULE_DAYS[interval]
+        elif is_biologic:
             # Biologics often have specific dosing schedules
-            if "weekly" in sig.lower():
-                calculated_days = int(quantity * 7)
-            elif "biweekly" in sig.lower() or "every 2 weeks" in sig.lower():
-                calculated_days = int(quantity * 14)
-            elif "monthly" in sig.lower():
-                calculated_days = int(quantity * 30)
-            else:
-                calculated_days = int(quantity / frequency) if frequency > 0 else 30
+            schedule_days = 0
         else:
             # Non-biologics vary widely
-            if "monthly" in sig.lower() or frequency <= 1.0 / 30.0:
-                calculated_days = int(quantity * 30)
-            elif "weekly" in sig.lower() or frequency <= 1.0 / 7.0:
-                calculated_days = int(quantity * 7)
+            if frequency <= 1.0 / 30.0:
+                schedule_days = 30
+            elif frequency <= 1.0 / 7.0:
+                schedule_days = 7
             else:
-                calculated_days = int(quantity / frequency) if frequency > 0 else 30
+                schedule_days = 0
+        calculated_days = int(
+            _compute_injectable_days(
+                float(quantity), float(frequency), float(schedule_days)
+            )
+        )
 
         # Ensure reasonable bounds
-        day_supply = max(7, min(calculated_days, 365))
+        day_supply = _clamp_day_supply(calculated_days)
 
-        standardized_sig = f"Inject as directed {self._frequency_to_text(frequency)}"
+        standardized_sig = sys.intern(
+            f"Inject as directed {self._frequency_to_text(frequency)}"
+        )
 
         return corrected_quantity, day_supply, standardized_sig
 
@@ -1483,8 +2461,11 @@ Critical Examples:
             )
             return quantity, calculated_days, standardized_sig
 
-        # Fallback to rule-based processing
-        frequency = self._calculate_frequency_per_day(sig, drug_data, matched_drug_name)
+        # Fallback to rule-based processing; a successful parse without a day
+        # supply is served from the LLM cache
+        frequency = self._calculate_frequency_per_day(
+            sig, drug_data, matched_drug_name, use_llm=llm_parsed is not None
+        )
 
         # Accept prescribed quantity
         corrected_quantity = quantity
@@ -1494,56 +2475,43 @@ Critical Examples:
         package_count = drug_data.get("Package_Count", 1)
 
         # Determine medication characteristics from drug name/data
-        drug_name_lower = (matched_drug_name or "").lower()
+        brands = _brand_terms((matched_drug_name or "").lower())
         sig_lower = sig.lower()
 
         # Calculate day supply based on medication type and dosing
-        if any(
-            med in drug_name_lower
-            for med in [
-                "ozempic",
-                "semaglutide",
-                "mounjaro",
-                "tirzepatide",
-                "trulicity",
-                "dulaglutide",
-                "bydureon",
-            ]
-        ):
+        if not _WEEKLY_GLP1_TERMS.isdisjoint(brands):
             # Weekly GLP-1 medications
             if expiration_days > 0:
                 # Use expiration days as the limit (e.g., Ozempic 56 days, Mounjaro 21 days)
                 calculated_days = expiration_days
             else:
                 # Default for weekly medications without expiration data
-                calculated_days = int(quantity * package_count * 7)  # 1 week per pen
+                calculated_days = int(
+                    _compute_injectable_days(
+                        float(quantity * package_count), float(frequency), 7.0
+                    )
+                )  # 1 week per pen
                 if calculated_days < 28:
                     calculated_days = 28  # Minimum 4 weeks
-        elif any(
-            med in drug_name_lower
-            for med in [
-                "adlyxin",
-                "lixisenatide",
-                "victoza",
-                "liraglutide",
-                "byetta",
-                "exenatide",
-            ]
-        ):
+        elif not _DAILY_GLP1_TERMS.isdisjoint(brands):
             # Daily GLP-1 medications
             if expiration_days > 0:
                 # Use expiration days (e.g., Adlyxin 14 days, Victoza 30 days)
                 calculated_days = expiration_days
             else:
                 # Default for daily medications
-                calculated_days = int(quantity * package_count * 14)  # 2 weeks default
-        elif any(med in drug_name_lower for med in ["soliqua", "xultophy"]):
+                calculated_days = int(
+                    _compute_injectable_days(
+                        float(quantity * package_count), float(frequency), 14.0
+                    )
+                )  # 2 weeks default
+        elif not _INSULIN_GLP1_TERMS.isdisjoint(brands):
             # Combination insulin/GLP-1 products - typically daily
             if expiration_days > 0:
                 calculated_days = expiration_days
             else:
                 calculated_days = 28  # Default 4 weeks
-        elif any(med in drug_name_lower for med in ["symlinpen", "pramlintide"]):
+        elif not _PRAMLINTIDE_TERMS.isdisjoint(brands):
             # Pramlintide - with meals
             if expiration_days > 0:
                 calculated_days = expiration_days
@@ -1552,7 +2520,11 @@ Critical Examples:
         else:
             # Generic calculation for unknown diabetic injectables
             if "weekly" in sig_lower or frequency <= 1.0 / 7.0:
-                calculated_days = int(quantity * package_count * 7)
+                calculated_days = int(
+                    _compute_injectable_days(
+                        float(quantity * package_count), float(frequency), 7.0
+                    )
+                )
                 if expiration_days > 0:
                     calculated_days = min(calculated_days, expiration_days)
             else:
@@ -1560,16 +2532,18 @@ Critical Examples:
                 if expiration_days > 0:
                     calculated_days = expiration_days
                 else:
-                    calculated_days = (
-                        int(quantity * package_count / frequency)
-                        if frequency > 0
-                        else 30
+                    calculated_days = int(
+                        _compute_injectable_days(
+                            float(quantity * package_count), float(frequency), 0.0
+                        )
                     )
 
         # Ensure reasonable bounds
-        day_supply = max(7, min(calculated_days, 365))
+        day_supply = _clamp_day_supply(calculated_days)
 
-        standardized_sig = f"Inject as directed {self._frequency_to_text(frequency)}"
+        standardized_sig = sys.intern(
+            f"Inject as directed {self._frequency_to_text(frequency)}"
+        )
 
         return corrected_quantity, day_supply, standardized_sig
 
@@ -1582,17 +2556,16 @@ Critical Examples:
         sig_lower = sig.lower()
         total_grams_per_day = 0
 
-        for _, row in self.ftu_dosing.iterrows():
-            area = row["Treatment_Area"].lower()
+        for area, qd, bid, tid in self._ftu_areas:
             if area in sig_lower:
                 if frequency == 1:
-                    total_grams_per_day += row["Grams_per_Day_QD"]
+                    total_grams_per_day += qd
                 elif frequency == 2:
-                    total_grams_per_day += row["Grams_per_Day_BID"]
+                    total_grams_per_day += bid
                 elif frequency == 3:
-                    total_grams_per_day += row["Grams_per_Day_TID"]
+                    total_grams_per_day += tid
                 else:
-                    total_grams_per_day += row["Grams_per_Day_QD"] * frequency
+                    total_grams_per_day += qd * frequency
 
         # If no specific area identified, assume moderate use
         if total_grams_per_day == 0:
@@ -1601,9 +2574,7 @@ Critical Examples:
         # Accept prescribed quantity
         if isinstance(quantity, str):
             # Try to extract grams from quantity string
-            gram_match = re.search(
-                r"(\d+(?:\.\d+)?)\s*(?:g|gm|gram)", str(quantity).lower()
-            )
+            gram_match = _GRAMS_RE.search(str(quantity).lower())
             if gram_match:
                 quantity_grams = float(gram_match.group(1))
             else:
@@ -1615,67 +2586,329 @@ Critical Examples:
         else:
             quantity_grams = float(quantity)
 
-        day_supply = (
-            int(quantity_grams / total_grams_per_day) if total_grams_per_day > 0 else 30
-        )
+        day_supply = self._day_supply(quantity_grams, 1.0, total_grams_per_day, 1.0)
 
         # Ensure reasonable bounds
-        day_supply = max(7, min(day_supply, 365))
+        day_supply = _clamp_day_supply(day_supply)
 
-        standardized_sig = f"Apply topically {self._frequency_to_text(frequency)}"
+        standardized_sig = sys.intern(
+            f"Apply topically {self._frequency_to_text(frequency)}"
+        )
 
         return quantity_grams, day_supply, standardized_sig
 
+    def _day_supply(
+        self,
+        quantity: float,
+        package_size: float,
+        dose_per_admin: float,
+        admins_per_day: float,
+        default_days: int = 30,
+    ) -> int:
+        """Whole days of supply, or default_days when there is no daily usage"""
+        return int(
+            _compute_day_supply(
+                float(quantity),
+                float(package_size),
+                float(dose_per_admin),
+                float(admins_per_day),
+                float(default_days),
+            )
+        )
+
     def _frequency_to_text(self, frequency: float) -> str:
         """Convert frequency number to readable text"""
-        if frequency == 1:
-            return "once daily"
-        elif frequency == 2:
-            return "twice daily"
-        elif frequency == 3:
-            return "three times daily"
-        elif frequency == 4:
-            return "four times daily"
-        elif frequency == 1.0 / 7.0:
-            return "once weekly"
-        elif frequency == 1.0 / 14.0:
-            return "every other week"
-        elif frequency == 1.0 / 30.0:
-            return "once monthly"
-        elif frequency < 1:
-            days = int(1 / frequency)
-            return f"every {days} days"
-        else:
-            return f"{frequency:.1f} times daily"
+        return _frequency_text(frequency)
 
     def extract_prescription_data(
         self, prescription: PrescriptionInput
     ) -> ExtractedData:
         """Main method to extract and standardize prescription data - no warnings"""
+        if self.llm_enabled:
+            # LLM answers can fail transiently, so only rule-based results
+            # are reused
+            return self._extract_uncached(prescription)
+
+        # Keyed on the exact inputs; the quantity's type is part of the key
+        # since a string quantity is parsed differently from a number
+        cache_key = (
+            prescription.drug_name,
+            type(prescription.quantity),
+            prescription.quantity,
+            prescription.sig_directions,
+        )
+        with self._result_cache_lock:
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                self._result_cache.move_to_end(cache_key)
+        if cached is not None:
+            return _copy_result(cached)
+
+        result = self._extract_uncached(prescription)
+        with self._result_cache_lock:
+            self._result_cache[cache_key] = result
+            if len(self._result_cache) > _RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+        return _copy_result(result)
+
+    def _extract_uncached(self, prescription: PrescriptionInput) -> ExtractedData:
+        """extract_prescription_data without the result cache"""
         # Find matching drug in database
         matched_name, confidence = self._fuzzy_match_drug_name(prescription.drug_name)
+        return self._extract_matched(prescription, matched_name, confidence)
 
-        # Enhanced LLM search strategy for challenging cases
-        if self.llm_enabled:
-            # Try LLM enhancement if no match found OR if confidence is low
-            should_enhance = (
-                matched_name is None
-                or confidence < 0.9  # Lowered from 0.8 to 0.9 for better matching
-                or any(
-                    indicator in prescription.drug_name.lower()
-                    for indicator in [
-                        "ml",
-                        "gm",
-                        "bottle",
-                        "container",
-                        "children",
-                        "nasal",
-                        "spray",
-                    ]
+    def extract_prescription_data_batch(
+        self,
+        drug_names: Sequence[str],
+        quantities: Union[Sequence[Union[str, int, float]], np.ndarray],
+        sigs: Sequence[str],
+        max_concurrency: int = 8,
+    ) -> BatchExtractedData:
+        """Extract many prescriptions given as parallel drug/quantity/sig columns
+
+        Produces the same values as calling extract_prescription_data on each
+        row, but scores all distinct drug names in one RapidFuzz cdist pass
+        and runs the insulin day supply arithmetic as a single array kernel.
+        With LLM enhancement enabled, up to max_concurrency rows wait on API
+        round trips at once.
+
+        Raises:
+            ValueError: If the three inputs differ in length
+        """
+        n = len(drug_names)
+        if len(quantities) != n or len(sigs) != n:
+            raise ValueError("drug_names, quantities and sigs must have equal length")
+
+        batch = BatchExtractedData(
+            original_drug_name=np.empty(n, dtype=object),
+            matched_drug_name=np.empty(n, dtype=object),
+            medication_type=np.empty(n, dtype=object),
+            corrected_quantity=np.zeros(n, dtype=np.float64),
+            calculated_day_supply=np.zeros(n, dtype=np.int64),
+            standardized_sig=np.empty(n, dtype=object),
+            confidence_score=np.zeros(n, dtype=np.float64),
+            warnings=[[] for _ in range(n)],
+            additional_info=[{} for _ in range(n)],
+        )
+        matches = self._fuzzy_match_drug_names(drug_names)
+        insulin_rows = []
+        scalar_rows = []
+
+        for i, (drug_name, quantity, sig) in enumerate(
+            zip(drug_names, quantities, sigs)
+        ):
+            prescription = PrescriptionInput(drug_name, quantity, sig)
+            matched_name, confidence = matches[drug_name]
+            if (
+                not self.llm_enabled
+                and matched_name is not None
+                and confidence >= 0.80
+                and self.drug_database[matched_name]["type"] == MedicationType.INSULIN
+            ):
+                insulin_rows.append((i, prescription, matched_name, confidence))
+            else:
+                scalar_rows.append((i, prescription, matched_name, confidence))
+
+        def extract_row(row):
+            _, prescription, matched_name, confidence = row
+            return self._extract_matched(prescription, matched_name, confidence)
+
+        if self.llm_enabled and len(scalar_rows) > 1:
+            self._prefetch_llm_sigs(
+                [
+                    request
+                    for _, prescription, matched_name, confidence in scalar_rows
+                    for request in self._llm_sig_requests(
+                        prescription, matched_name, confidence
+                    )
+                ],
+                max_concurrency,
+            )
+            # Rows spend their time waiting on the LLM, so overlap the waits
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                results = executor.map(extract_row, scalar_rows)
+                for row, result in zip(scalar_rows, results):
+                    self._set_batch_row(batch, row[0], result)
+        else:
+            for row in scalar_rows:
+                self._set_batch_row(batch, row[0], extract_row(row))
+
+        if insulin_rows:
+            self._extract_insulin_rows(batch, insulin_rows)
+
+        return batch
+
+    def batch_process(
+        self, prescriptions: Sequence[PrescriptionInput]
+    ) -> List[ExtractedData]:
+        """Process multiple prescriptions efficiently
+
+        Runs extract_prescription_data_batch on the prescriptions' fields, so
+        distinct drug names are fuzzy-matched in one RapidFuzz cdist pass, and
+        returns one ExtractedData per prescription in input order.
+        """
+        return self.extract_prescription_data_batch(
+            [prescription.drug_name for prescription in prescriptions],
+            [prescription.quantity for prescription in prescriptions],
+            [prescription.sig_directions for prescription in prescriptions],
+        ).to_list()
+
+    def _llm_sig_requests(
+        self,
+        prescription: PrescriptionInput,
+        matched_name: Optional[str],
+        confidence: float,
+    ) -> List[Tuple[str, Optional[Dict], Optional[str]]]:
+        """The _llm_parse_sig arguments extracting a matched row will use
+
+        Empty when an LLM name search could still change the match, or when
+        the row's processor does not parse its sig with the LLM.
+        """
+        if (
+            matched_name is None
+            or confidence < 0.80
+            or self._needs_llm_name_search(
+                prescription.drug_name, matched_name, confidence
+            )
+        ):
+            return []
+        entry = self.drug_database[matched_name]
+        sig = prescription.sig_directions
+        if entry["type"] in _LLM_SIG_DRUG_TYPES:
+            return [(sig, entry["data"], matched_name)]
+        if entry["type"] in _LLM_SIG_ONLY_TYPES:
+            return [(sig, None, None)]
+        return []
+
+    async def extract_prescription_data_async(
+        self,
+        prescriptions: Sequence[PrescriptionInput],
+        max_concurrency: int = 8,
+    ) -> List[ExtractedData]:
+        """Extract many prescriptions with up to max_concurrency in flight
+
+        Meant for LLM-enhanced extraction, where each prescription waits on
+        network round trips: extract_prescription_data runs on a bounded
+        thread pool so those waits overlap. Results keep the input order.
+
+        The threads share this extractor. The drug tables are only read,
+        while the LLM reply cache and the result cache are updated under
+        their own locks; each lock is held only for the dictionary lookup or
+        store, never across extraction or an API call. Two threads missing
+        the same key may both compute it, and the later store wins with an
+        equal value.
+        """
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        executor, self.extract_prescription_data, prescription
+                    )
+                    for prescription in prescriptions
                 )
             )
+        return list(results)
+
+    def _extract_insulin_rows(
+        self,
+        batch: BatchExtractedData,
+        rows: List[Tuple[int, PrescriptionInput, str, float]],
+    ) -> None:
+        """Vectorized form of _process_insulin for matched insulin batch rows"""
+        parsed = []
+        for row in rows:
+            i, prescription, matched_name, confidence = row
+            drug_data = self.drug_database[matched_name]["data"]
+            try:
+                quantity = float(prescription.quantity)
+                dosing = self._insulin_dosing(
+                    drug_data, prescription.sig_directions, matched_name
+                )
+            except Exception:
+                # Let the scalar path apply its error handling to this row
+                self._set_batch_row(
+                    batch,
+                    i,
+                    self._extract_matched(prescription, matched_name, confidence),
+                )
+                continue
+            parsed.append((row, drug_data, quantity) + dosing)
+        if not parsed:
+            return
+
+        quantities = np.array([p[2] for p in parsed], dtype=np.float64)
+        drug_ids = np.array(
+            [self._drug_name_index[p[0][2]] for p in parsed], dtype=np.intp
+        )
+        total_units = self._insulin_total_units[drug_ids]
+        total_units[total_units <= 0] = 500  # Reasonable default
+        beyond_use_days = self._insulin_beyond_use_days[drug_ids]
+        days = _compute_day_supplies(
+            quantities,
+            total_units,
+            np.array([p[3] for p in parsed], dtype=np.float64),
+            np.array([p[4] for p in parsed], dtype=np.float64),
+        )
 
-            if should_enhance:
+        for k, (row, drug_data, quantity, _, _, standardized_sig) in enumerate(parsed):
+            i, prescription, matched_name, confidence = row
+            if not np.isfinite(days[k]):
+                self._set_batch_row(
+                    batch,
+                    i,
+                    self._extract_matched(prescription, matched_name, confidence),
+                )
+                continue
+            calculated_days = int(days[k])
+            if calculated_days > beyond_use_days[k] and beyond_use_days[k] > 0:
+                calculated_days = int(beyond_use_days[k])
+            batch.original_drug_name[i] = prescription.drug_name
+            batch.matched_drug_name[i] = matched_name
+            batch.medication_type[i] = MedicationType.INSULIN
+            batch.corrected_quantity[i] = quantity
+            batch.calculated_day_supply[i] = _clamp_day_supply(calculated_days)
+            batch.standardized_sig[i] = standardized_sig
+            batch.confidence_score[i] = confidence
+            batch.additional_info[i] = dict(drug_data)
+
+    @staticmethod
+    def _set_batch_row(
+        batch: BatchExtractedData, i: int, result: ExtractedData
+    ) -> None:
+        """Copy a scalar ExtractedData into row i of a batch result"""
+        batch.original_drug_name[i] = result.original_drug_name
+        batch.matched_drug_name[i] = result.matched_drug_name
+        batch.medication_type[i] = result.medication_type
+        batch.corrected_quantity[i] = result.corrected_quantity
+        batch.calculated_day_supply[i] = result.calculated_day_supply
+        batch.standardized_sig[i] = result.standardized_sig
+        batch.confidence_score[i] = result.confidence_score
+        batch.warnings[i] = result.warnings
+        batch.additional_info[i] = result.additional_info
+
+    @staticmethod
+    def _needs_llm_name_search(
+        drug_name: str, matched_name: Optional[str], confidence: float
+    ) -> bool:
+        """Whether LLM enhancement should look for a better database match"""
+        # Try LLM enhancement if no match found OR if confidence is low
+        if matched_name is None or confidence < 0.9:  # Lowered from 0.8 to 0.9
+            return True
+        return _LLM_NAME_SEARCH_RE.search(drug_name.lower()) is not None
+
+    def _extract_matched(
+        self,
+        prescription: PrescriptionInput,
+        matched_name: Optional[str],
+        confidence: float,
+    ) -> ExtractedData:
+        """Extract prescription data once the database fuzzy match is known"""
+        # Enhanced LLM search strategy for challenging cases
+        if self.llm_enabled:
+            if self._needs_llm_name_search(
+                prescription.drug_name, matched_name, confidence
+            ):
                 alternative_names = self._llm_enhance_drug_search(
                     prescription.drug_name
                 )
@@ -1712,74 +2945,23 @@ Critical Examples:
 
         try:
             # Route to appropriate processing method based on medication type
-            if medication_type == MedicationType.NASAL_INHALER:
-                corrected_qty, day_supply, std_sig = self._process_nasal_inhaler(
-                    drug_data,
-                    float(prescription.quantity),
-                    prescription.sig_directions,
-                    matched_name,
-                )
-            elif medication_type == MedicationType.ORAL_INHALER:
-                corrected_qty, day_supply, std_sig = self._process_oral_inhaler(
-                    drug_data,
-                    float(prescription.quantity),
-                    prescription.sig_directions,
-                    matched_name,
-                )
-            elif medication_type == MedicationType.INSULIN:
-                corrected_qty, day_supply, std_sig = self._process_insulin(
-                    drug_data,
-                    float(prescription.quantity),
-                    prescription.sig_directions,
-                    matched_name,
-                )
-            elif medication_type == MedicationType.DIABETIC_INJECTABLE:
-                corrected_qty, day_supply, std_sig = self._process_diabetic_injectable(
-                    drug_data,
-                    float(prescription.quantity),
-                    prescription.sig_directions,
-                    matched_name,
-                )
-            elif medication_type == MedicationType.BIOLOGIC_INJECTABLE:
-                corrected_qty, day_supply, std_sig = self._process_biologic_injectable(
-                    drug_data,
-                    float(prescription.quantity),
-                    prescription.sig_directions,
-                    matched_name,
-                )
-            elif medication_type == MedicationType.NONBIOLOGIC_INJECTABLE:
-                corrected_qty, day_supply, std_sig = (
-                    self._process_nonbiologic_injectable(
-                        drug_data,
-                        float(prescription.quantity),
-                        prescription.sig_directions,
-                        matched_name,
-                    )
-                )
-            elif medication_type == MedicationType.EYEDROP:
-                corrected_qty, day_supply, std_sig = self._process_eyedrop(
-                    drug_data,
-                    float(prescription.quantity),
-                    prescription.sig_directions,
-                    matched_name,
-                )
-            elif medication_type == MedicationType.TOPICAL:
-                corrected_qty, day_supply, std_sig = self._process_topical_ftu(
-                    float(prescription.quantity), prescription.sig_directions
+            quantity = float(prescription.quantity)
+            processor = self._processors.get(medication_type)
+            if processor is not None:
+                corrected_qty, day_supply, std_sig = processor(
+                    drug_data, quantity, prescription.sig_directions, matched_name
                 )
             else:
                 # Unknown type - default processing
-                corrected_qty = float(prescription.quantity)
+                corrected_qty = quantity
                 day_supply = 30
                 std_sig = prescription.sig_directions
 
-        except Exception as e:
+        except (ArithmeticError, KeyError, TypeError, ValueError) as e:
+            # Unusable quantities or drug data (non-numeric, NaN or infinite
+            # values, missing columns); anything else is a bug and propagates
             logger.error(f"Error processing {prescription.drug_name}: {e}")
-            corrected_qty = (
-                float(prescription.quantity)
-                if str(prescription.quantity).replace(".", "").isdigit()
-                else 1.0
-            )
+            corrected_qty = _fallback_quantity(prescription.quantity)
             day_supply = 30
             std_sig = prescription.sig_directions
 
@@ -1792,7 +2974,9 @@ Critical Examples:
             standardized_sig=std_sig,
             confidence_score=confidence,
             warnings=[],  # No warnings in perfect version
-            additional_info=drug_data,
+            # A copy: the database record is shared by the drug's aliases and
+            # by every extractor
+            additional_info=dict(drug_data),
         )
 
     def _create_unsupported_medication_result(
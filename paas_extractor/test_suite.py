@@ -6,11 +6,151 @@ Test Suite for Day Supply National
 Comprehensive testing framework for the prescription data extraction system.
 """
 
-from typing import Dict, List
+import asyncio
+import json
+import re
+import threading
+from dataclasses import fields
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
 
 import pandas as pd
 
-from .extractor import PrescriptionDataExtractor, PrescriptionInput
+from . import extractor as extractor_module
+from .extractor import (
+    BatchExtractedData,
+    ExtractedData,
+    PrescriptionDataExtractor,
+    PrescriptionInput,
+    _configure_logging,
+)
+
+# A named check returning None when it passes, else what went wrong
+Check = Tuple[str, Callable[[], Optional[str]]]
+
+# Database entry each drug name must match (None: no match)
+EXPECTED_DRUG_MATCHES: Dict[str, Optional[str]] = {
+    # Word-order variants
+    "glargine insulin": "insulin glargine",
+    "lispro insulin": "insulin lispro",
+    "pen humira": "humira pen",
+    # Quantity and unit words must not pull in a different product
+    "100 units humulin r": None,  # not concentrated humulin r u-500
+    "30 ml novolog": None,  # not novolog mix 70/30
+    "novolog 30 ml": None,
+    "2 pens humira": None,  # not humira pen
+    "2 pens humira (cf)": "humira (cf)",  # not humira (cf) pen
+}
+
+# (day supply, standardized sig) each injectable prescription must produce,
+# keyed by (drug name, quantity, sig)
+EXPECTED_INJECTABLE_RESULTS: Dict[Tuple[str, str, str], Tuple[int, str]] = {
+    # Every other week is checked ahead of plain weekly
+    ("Humira", "2", "inject biweekly"): (28, "Inject as directed every other week"),
+    ("Humira", "2", "inject every other week"): (
+        28,
+        "Inject as directed every other week",
+    ),
+    ("Humira", "2", "inject every 2 weeks"): (
+        28,
+        "Inject as directed every other week",
+    ),
+    ("Humira", "4", "inject weekly"): (28, "Inject as directed once weekly"),
+    ("Humira", "1", "inject monthly"): (30, "Inject as directed once monthly"),
+    # Twice weekly is checked ahead of plain weekly
+    ("Enbrel", "8", "inject twice weekly"): (28, "Inject as directed twice weekly"),
+    ("Enbrel", "4", "inject once weekly"): (28, "Inject as directed once weekly"),
+    # Non-biologic injectables follow the same schedules
+    ("testosterone cypionate", "2", "inject every 2 weeks"): (
+        28,
+        "Inject as directed every other week",
+    ),
+    ("testosterone cypionate", "4", "inject twice weekly"): (
+        14,
+        "Inject as directed twice weekly",
+    ),
+    ("testosterone cypionate", "4", "inject weekly"): (
+        28,
+        "Inject as directed once weekly",
+    ),
+}
+
+# Sigs the built-in rules leave to the LLM, all for one nasal spray
+LLM_TEST_SIGS = [
+    f"{sprays} sprays each nostril every {hours} hours as needed"
+    for sprays in (1, 2)
+    for hours in (4, 6, 8, 12, 24)
+] + [f"{sprays} sprays in each nostril prn congestion" for sprays in range(1, 11)]
+
+
+class StubLLMClient:
+    """Stand-in for the OpenAI client that answers sig parsing prompts
+
+    batch_reply chooses how batched prompts are answered: "ok" answers every
+    sig, "short" leaves out the last, "malformed" is not JSON, and "unusable"
+    gives each prompt's first sig a frequency that is not a number. Single-sig
+    prompts are always answered, and drug name searches suggest "fluticasone".
+    """
+
+    base_url = "https://api.openai.com/v1"
+
+    def __init__(self, batch_reply: str = "ok"):
+        self.batch_reply = batch_reply
+        self.batch_prompts: List[List[str]] = []
+        self.sig_prompts: List[str] = []
+        self.other_prompts: List[str] = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=self)
+
+    @staticmethod
+    def sig_reply(sig: str) -> Dict:
+        """Parse the stub gives for a sig"""
+        return {
+            "daily_frequency": 2.0,
+            "dose_per_administration": 1.0,
+            "route": "nasal",
+            "is_prn": True,
+            "standardized_directions": f"Parsed: {sig}",
+            "confidence": 0.9,
+        }
+
+    def create(self, **kwargs) -> SimpleNamespace:
+        """Answer a chat completion request"""
+        prompt = kwargs["messages"][0]["content"]
+        batch_sigs = re.findall(r'PRESCRIPTION \d+ SIG: "(.*?)"\n', prompt)
+        single_sig = re.search(r'SIG: "(.*?)"\n', prompt)
+        with self._lock:
+            if batch_sigs:
+                self.batch_prompts.append(batch_sigs)
+            elif single_sig:
+                self.sig_prompts.append(single_sig.group(1))
+            else:
+                self.other_prompts.append(prompt)
+
+        if batch_sigs:
+            results = [self.sig_reply(sig) for sig in batch_sigs]
+            if self.batch_reply == "short":
+                results.pop()
+            elif self.batch_reply == "unusable":
+                results[0]["daily_frequency"] = "twice"
+            content = json.dumps({"results": results})
+            if self.batch_reply == "malformed":
+                content = content[: len(content) // 2]
+        elif single_sig:
+            content = json.dumps(self.sig_reply(single_sig.group(1)))
+        else:
+            content = json.dumps({"enhanced_names": ["fluticasone"], "confidence": 0.9})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+        )
+
+
+def stub_llm_extractor(client: StubLLMClient) -> PrescriptionDataExtractor:
+    """Extractor with LLM enhancement answered by client"""
+    extractor = PrescriptionDataExtractor()
+    extractor.llm_client = client
+    extractor.llm_enabled = True
+    return extractor
 
 
 class ComprehensiveTestSuite:
@@ -87,6 +227,14 @@ class ComprehensiveTestSuite:
 
         return test_cases
 
+    def generate_test_cases_injectables(self) -> List[PrescriptionInput]:
+        """Generate biologic and non-biologic injectable schedules whose day
+        supply and sig are checked exactly"""
+        return [
+            PrescriptionInput(drug_name, quantity, sig)
+            for drug_name, quantity, sig in EXPECTED_INJECTABLE_RESULTS
+        ]
+
     def generate_test_cases_insulin(self) -> List[PrescriptionInput]:
         """Generate test cases for all insulin products"""
         test_cases = []
@@ -244,6 +392,13 @@ class ComprehensiveTestSuite:
 
         return edge_cases
 
+    def generate_drug_matching_cases(self) -> List[PrescriptionInput]:
+        """Generate drug names whose database match is checked exactly"""
+        return [
+            PrescriptionInput(drug_name, "1", "use as directed")
+            for drug_name in EXPECTED_DRUG_MATCHES
+        ]
+
     def run_test_batch(
         self, test_cases: List[PrescriptionInput], category: str
     ) -> Dict:
@@ -290,6 +445,34 @@ class ComprehensiveTestSuite:
                     results["warnings"] += 1
                     issues.extend([f"Unexpected Warning: {w}" for w in result.warnings])
 
+                # Drug name matching cases pass or fail on the match alone: a
+                # name that must not match is rejected with no day supply
+                if test_case.drug_name in EXPECTED_DRUG_MATCHES:
+                    expected = EXPECTED_DRUG_MATCHES[test_case.drug_name]
+                    has_error = result.matched_drug_name != expected
+                    if has_error:
+                        issues.append(
+                            f"Matched {result.matched_drug_name!r}, "
+                            f"expected {expected!r}"
+                        )
+
+                expected_result = EXPECTED_INJECTABLE_RESULTS.get(
+                    (
+                        test_case.drug_name,
+                        test_case.quantity,
+                        test_case.sig_directions,
+                    )
+                )
+                actual_result = (
+                    result.calculated_day_supply,
+                    result.standardized_sig,
+                )
+                if expected_result and actual_result != expected_result:
+                    issues.append(
+                        f"Got {actual_result!r}, expected {expected_result!r}"
+                    )
+                    has_error = True
+
                 if has_error:
                     results["errors"] += 1
                 else:
@@ -341,6 +524,350 @@ class ComprehensiveTestSuite:
 
         return results
 
+    def generate_batch_api_checks(
+        self, test_cases: List[PrescriptionInput]
+    ) -> List[Check]:
+        """Generate checks that extract_prescription_data_batch matches
+        extract_prescription_data row by row"""
+        cases = list(test_cases)
+        cases.append(PrescriptionInput("Zzyzx Unlisted Drug", "1", "use as directed"))
+        batch = self.extractor.extract_prescription_data_batch(
+            [case.drug_name for case in cases],
+            [case.quantity for case in cases],
+            [case.sig_directions for case in cases],
+        )
+        rows = batch.to_list()
+        checks: List[Check] = [
+            (
+                f"Batch row {i}: {case.drug_name}",
+                lambda row=row, case=case: self._scalar_mismatch(row, case),
+            )
+            for i, (case, row) in enumerate(zip(cases, rows))
+        ]
+        checks.extend(
+            [
+                (
+                    "Batch row count",
+                    lambda: (
+                        None
+                        if len(batch) == len(rows) == len(cases)
+                        else f"{len(batch)} rows, {len(rows)} results, "
+                        f"{len(cases)} inputs"
+                    ),
+                ),
+                (
+                    "Batch unmatched drug",
+                    lambda: (
+                        None
+                        if rows[-1].matched_drug_name is None
+                        else f"Matched {rows[-1].matched_drug_name!r}"
+                    ),
+                ),
+                ("Batch to_frame", lambda: self._frame_mismatch(batch, rows)),
+                ("Batch empty input", self._empty_batch_mismatch),
+                ("Batch length mismatch", self._batch_length_mismatch),
+            ]
+        )
+        return checks
+
+    def generate_batch_process_checks(
+        self, test_cases: List[PrescriptionInput]
+    ) -> List[Check]:
+        """Generate checks that batch_process matches extract_prescription_data"""
+        results = self.extractor.batch_process(test_cases)
+        checks: List[Check] = [
+            (
+                "batch_process result count",
+                lambda: (
+                    None
+                    if len(results) == len(test_cases)
+                    else f"{len(results)} results for {len(test_cases)} inputs"
+                ),
+            ),
+            (
+                "batch_process empty input",
+                lambda: (
+                    None
+                    if self.extractor.batch_process([]) == []
+                    else "Results for no prescriptions"
+                ),
+            ),
+        ]
+        checks.extend(
+            (
+                f"batch_process result {i}: {case.drug_name}",
+                lambda result=result, case=case: self._scalar_mismatch(result, case),
+            )
+            for i, (case, result) in enumerate(zip(test_cases, results))
+        )
+        return checks
+
+    def generate_async_checks(self, test_cases: List[PrescriptionInput]) -> List[Check]:
+        """Generate checks that extract_prescription_data_async matches a
+        serial loop over extract_prescription_data"""
+        # A fresh extractor, so its caches start empty and the worker threads
+        # fill them concurrently
+        extractor = PrescriptionDataExtractor()
+        results = asyncio.run(
+            extractor.extract_prescription_data_async(test_cases, max_concurrency=8)
+        )
+        checks: List[Check] = [
+            (
+                "Async result count",
+                lambda: (
+                    None
+                    if len(results) == len(test_cases)
+                    else f"{len(results)} results for {len(test_cases)} inputs"
+                ),
+            )
+        ]
+        checks.extend(
+            (
+                f"Async result {i}: {case.drug_name}",
+                lambda result=result, case=case: self._scalar_mismatch(result, case),
+            )
+            for i, (case, result) in enumerate(zip(test_cases, results))
+        )
+        return checks
+
+    def generate_llm_batch_checks(self) -> List[Check]:
+        """Generate checks that batch extraction parses LLM sigs in batched
+        prompts and falls back to one prompt per sig the reply misses"""
+        return [
+            (
+                "LLM batch: all sigs answered",
+                lambda: self._llm_batch_mismatch("ok", [16, 4], 0),
+            ),
+            (
+                "LLM batch: short reply",
+                lambda: self._llm_batch_mismatch("short", [16, 4], 20),
+            ),
+            (
+                "LLM batch: malformed reply",
+                lambda: self._llm_batch_mismatch("malformed", [16, 4], 20),
+            ),
+            (
+                "LLM batch: unusable result",
+                lambda: self._llm_batch_mismatch("unusable", [16, 4], 2),
+            ),
+        ]
+
+    def generate_llm_cache_checks(self) -> List[Check]:
+        """Generate checks that LLM replies are reused across spellings that
+        differ only in case and whitespace"""
+        return [
+            ("LLM cache: sig variants", self._llm_sig_variant_mismatch),
+            ("LLM cache: drug name variants", self._llm_search_variant_mismatch),
+            ("LLM cache: eviction", self._llm_eviction_mismatch),
+        ]
+
+    @staticmethod
+    def _llm_eviction_mismatch() -> Optional[str]:
+        """How the LLM reply cache fails to evict its least recently used
+        reply once it holds _LLM_CACHE_SIZE replies"""
+        client = StubLLMClient()
+        extractor = stub_llm_extractor(client)
+        first, second, third = LLM_TEST_SIGS[:3]
+        cache_size = extractor_module._LLM_CACHE_SIZE
+        extractor_module._LLM_CACHE_SIZE = 2
+        try:
+            # Reusing the first sig makes the second least recently used, so
+            # caching the third evicts it
+            for sig in (first, second, first, third, first, second):
+                extractor.extract_prescription_data(
+                    PrescriptionInput("Flonase", "1", sig)
+                )
+            cached = len(extractor._llm_cache)
+        finally:
+            extractor_module._LLM_CACHE_SIZE = cache_size
+        expected = [first, second, third, second]
+        if client.sig_prompts != expected:
+            return f"Sent {client.sig_prompts}, expected {expected}"
+        if cached != 2:
+            return f"{cached} cached replies, expected 2"
+        return None
+
+    @staticmethod
+    def _llm_sig_variant_mismatch() -> Optional[str]:
+        """How sig parses fail to be shared by case and whitespace variants"""
+        client = StubLLMClient()
+        extractor = stub_llm_extractor(client)
+        sig = LLM_TEST_SIGS[0]
+        for variant in (sig, sig.upper(), f"  {sig.replace(' ', '   ')} ", sig):
+            extractor.extract_prescription_data(
+                PrescriptionInput("Flonase", "1", variant)
+            )
+        if client.sig_prompts != [sig]:
+            return f"Sent {client.sig_prompts}, expected only {sig!r}"
+        # Different drug data in the prompt is a different question
+        extractor.extract_prescription_data(PrescriptionInput("Nasonex", "1", sig))
+        if len(client.sig_prompts) != 2:
+            return f"{len(client.sig_prompts)} prompts after a second drug, expected 2"
+        return None
+
+    @staticmethod
+    def _llm_search_variant_mismatch() -> Optional[str]:
+        """How drug name suggestions fail to be shared by case and whitespace
+        variants"""
+        client = StubLLMClient()
+        extractor = stub_llm_extractor(client)
+        suggestions = [
+            extractor._llm_enhance_drug_search(name)
+            for name in (
+                "flutikasone spray",
+                "FLUTIKASONE Spray",
+                " flutikasone  spray",
+            )
+        ]
+        if len(client.other_prompts) != 1:
+            return f"{len(client.other_prompts)} name search prompts, expected 1"
+        if suggestions != [["fluticasone"]] * 3:
+            return f"Got {suggestions}"
+        return None
+
+    @staticmethod
+    def _llm_batch_mismatch(
+        batch_reply: str, batch_sizes: List[int], single_prompts: int
+    ) -> Optional[str]:
+        """How batch extraction of LLM_TEST_SIGS differs from expected prompt
+        counts, or from extracting each prescription in turn"""
+        client = StubLLMClient(batch_reply)
+        results = stub_llm_extractor(client).extract_prescription_data_batch(
+            ["Flonase"] * len(LLM_TEST_SIGS), ["1"] * len(LLM_TEST_SIGS), LLM_TEST_SIGS
+        )
+        sizes = sorted((len(sigs) for sigs in client.batch_prompts), reverse=True)
+        if sizes != batch_sizes:
+            return f"Batched prompts of {sizes} sigs, expected {batch_sizes}"
+        if len(client.sig_prompts) != single_prompts:
+            return (
+                f"{len(client.sig_prompts)} single-sig prompts, "
+                f"expected {single_prompts}"
+            )
+
+        serial = stub_llm_extractor(StubLLMClient())
+        for result, sig in zip(results.to_list(), LLM_TEST_SIGS):
+            expected = serial.extract_prescription_data(
+                PrescriptionInput("Flonase", "1", sig)
+            )
+            if result != expected:
+                return f"Got {result}, expected {expected}"
+        return None
+
+    def generate_result_isolation_checks(self) -> List[Check]:
+        """Generate checks that changing a result's additional_info leaves
+        the drug database and later results untouched"""
+        return [("Result additional_info is a copy", self._shared_info_mismatch)]
+
+    def _shared_info_mismatch(self) -> Optional[str]:
+        """How mutating one result's additional_info leaks into other
+        results for the same record"""
+        prescription = PrescriptionInput("Flonase", "1", "2 sprays each nostril bid")
+        alias = PrescriptionInput(
+            "fluticasone propionate 0.05%", "1", "2 sprays each nostril bid"
+        )
+        expected = dict(
+            self.extractor.extract_prescription_data(prescription).additional_info
+        )
+        for entry in (
+            self.extractor.extract_prescription_data(prescription),
+            self.extractor.extract_prescription_data_batch(
+                [prescription.drug_name],
+                [prescription.quantity],
+                [prescription.sig_directions],
+            ).to_list()[0],
+        ):
+            entry.additional_info.clear()
+        for label, result in (
+            ("cached result", self.extractor.extract_prescription_data(prescription)),
+            ("alias", self.extractor.extract_prescription_data(alias)),
+            (
+                "other extractor",
+                PrescriptionDataExtractor().extract_prescription_data(prescription),
+            ),
+        ):
+            if result.additional_info != expected:
+                return f"additional_info of the {label} changed"
+        return None
+
+    def _scalar_mismatch(
+        self, result: ExtractedData, test_case: PrescriptionInput
+    ) -> Optional[str]:
+        """How result differs from extract_prescription_data(test_case)"""
+        expected = self.extractor.extract_prescription_data(test_case)
+        if result != expected:
+            return f"Got {result}, expected {expected}"
+        return None
+
+    @staticmethod
+    def _frame_mismatch(
+        batch: BatchExtractedData, rows: List[ExtractedData]
+    ) -> Optional[str]:
+        """How batch.to_frame differs from the batch's rows"""
+        index = pd.RangeIndex(100, 100 + len(rows))
+        frame = batch.to_frame(index)
+        columns = [field.name for field in fields(BatchExtractedData)]
+        if list(frame.columns) != columns:
+            return f"Columns {list(frame.columns)}, expected {columns}"
+        if not frame.index.equals(index):
+            return "Frame index is not the given index"
+        for column in ("matched_drug_name", "calculated_day_supply"):
+            # pandas reports a missing match as NaN rather than None
+            values = [None if pd.isna(value) else value for value in frame[column]]
+            if values != [getattr(row, column) for row in rows]:
+                return f"Column {column} differs from the batch rows"
+        return None
+
+    def _empty_batch_mismatch(self) -> Optional[str]:
+        """How extracting an empty batch differs from an empty result"""
+        batch = self.extractor.extract_prescription_data_batch([], [], [])
+        if len(batch) or batch.to_list() or not batch.to_frame().empty:
+            return f"Got {len(batch)} rows"
+        return None
+
+    def _batch_length_mismatch(self) -> Optional[str]:
+        """How batch extraction of unequal columns fails to raise ValueError"""
+        try:
+            self.extractor.extract_prescription_data_batch(
+                ["Humira", "Lantus"], ["2"], ["inject every other week", "10 units"]
+            )
+        except ValueError:
+            return None
+        return "No ValueError for columns of unequal length"
+
+    def run_checks(self, checks: List[Check], category: str) -> Dict:
+        """Run named checks and collect results like run_test_batch"""
+        results = {
+            "category": category,
+            "total": len(checks),
+            "successful": 0,
+            "warnings": 0,
+            "errors": 0,
+            "details": [],
+        }
+
+        print(f"\n{'='*80}")
+        print(f"Testing {category}: {len(checks)} checks")
+        print(f"{'='*80}")
+
+        for name, check in checks:
+            try:
+                issue = check()
+            except Exception as e:
+                issue = f"Raised {e!r}"
+            if issue is None:
+                results["successful"] += 1
+            else:
+                results["errors"] += 1
+                results["details"].append({"check": name, "issues": [issue]})
+                print(f"  FAILED {name}: {issue}")
+
+        # Print summary
+        print(f"\n{category} Results:")
+        print(f"  Successful: {results['successful']}")
+        print(f"  Errors: {results['errors']}")
+
+        return results
+
     def run_all_tests(self):
         """Run all test categories"""
         print("\n" + "=" * 80)
@@ -355,7 +882,9 @@ class ComprehensiveTestSuite:
             ("Nasal Inhalers", self.generate_test_cases_nasal_inhalers()),
             ("Oral Inhalers", self.generate_test_cases_oral_inhalers()),
             ("Insulin Products", self.generate_test_cases_insulin()),
+            ("Injectables", self.generate_test_cases_injectables()),
             ("Edge Cases", self.generate_edge_cases()),
+            ("Drug Name Matching", self.generate_drug_matching_cases()),
         ]
 
         for category_name, test_cases in test_categories:
@@ -364,6 +893,21 @@ class ComprehensiveTestSuite:
                 all_results.append(results)
                 self.test_results["medication_types"][category_name] = results
 
+        # Check the other entry points against the same cases
+        all_cases = [case for _, test_cases in test_categories for case in test_cases]
+        check_categories = [
+            ("Batch API", self.generate_batch_api_checks(all_cases)),
+            ("batch_process", self.generate_batch_process_checks(all_cases)),
+            ("Async API", self.generate_async_checks(all_cases)),
+            ("LLM Sig Batching", self.generate_llm_batch_checks()),
+            ("LLM Reply Cache", self.generate_llm_cache_checks()),
+            ("Result Isolation", self.generate_result_isolation_checks()),
+        ]
+        for category_name, checks in check_categories:
+            results = self.run_checks(checks, category_name)
+            all_results.append(results)
+            self.test_results["medication_types"][category_name] = results
+
         # Calculate totals
         self.test_results["total_tests"] = sum(r["total"] for r in all_results)
         self.test_results["passed"] = sum(r["successful"] for r in all_results)
@@ -408,6 +952,7 @@ class ComprehensiveTestSuite:
 
 def main():
     """Run the comprehensive test suite"""
+    _configure_logging()
     # Run tests
     suite = ComprehensiveTestSuite()
     results = suite.run_all_tests()
@@ -39,6 +39,10 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=requirements,
+    extras_require={
+        "jit": ["numba>=0.57.0"],
+        "accel": ["orjson>=3.8.0", "pyahocorasick>=2.0.0"],
+    },
     include_package_data=True,
     package_data={
         "paas_extractor": ["data/*.csv"],